@@ -12,6 +12,12 @@ from ftw.builder.registry import builder_registry
 from ftw.builder.builder import Builder
 from ftw.builder.builder import ticking_creator
 from ftw.builder.builder import create
+from ftw.builder.builder import create_many
+from ftw.builder.builder import create_once
+from ftw.builder.builder import iter_create
+from ftw.builder.fixture import load_fixture
+from ftw.builder.snapshot import create_clones
+from ftw.builder.tree import create_tree
 
 import ftw.builder.content
 import ftw.builder.group
@@ -20,3 +26,4 @@ import ftw.builder.zcml
 import ftw.builder.package
 import ftw.builder.genericsetup
 import ftw.builder.portlets
+import ftw.builder.snapshot
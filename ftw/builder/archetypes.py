@@ -1,4 +1,5 @@
 from ftw.builder.builder import PloneObjectBuilder
+from ftw.builder.naming import normalize_url_name
 from zope.container.interfaces import INameChooser
 
 
@@ -7,11 +8,21 @@ class ArchetypesBuilder(PloneObjectBuilder):
     def __init__(self, *args, **kwargs):
         super(ArchetypesBuilder, self).__init__(*args, **kwargs)
         self._id = None
+        self.process_form = True
 
     def with_id(self, id_):
         self._id = id_
         return self
 
+    def without_process_form(self):
+        """Do not call ``processForm`` on the created object, which
+        validates, renames and reindexes it and fires events. The object is
+        only marked as initialized and reindexed when the indexing is
+        flushed, which is once for all objects in a batch.
+        """
+        self.process_form = False
+        return self
+
     def create_object(self, processForm=True):
         name = self.choose_name()
         self.container.invokeFactory(
@@ -20,7 +31,10 @@ class ArchetypesBuilder(PloneObjectBuilder):
 
         self.set_properties(obj)
 
-        if processForm:
+        if not self.process_form:
+            obj.unmarkCreationFlag()
+            self.session.index(obj)
+        elif processForm:
             obj.processForm()
         return obj
 
@@ -30,4 +44,7 @@ class ArchetypesBuilder(PloneObjectBuilder):
 
         title = self.arguments.get('title', self.portal_type)
         chooser = INameChooser(self.container)
-        return chooser.chooseName(title, self.container)
+        return self.session.id_allocator.allocate(
+            self.container, title,
+            lambda: chooser.chooseName(title, self.container),
+            normalize_url_name)
@@ -1,9 +1,15 @@
 from Acquisition import aq_base
+from Products.CMFCore.interfaces import IContentish
 from Products.CMFCore.utils import getToolByName
+from Products.DCWorkflow.DCWorkflow import DCWorkflowDefinition
+from Products.DCWorkflow.utils import modifyRolesForPermission
 from ftw.builder import registry
 from ftw.builder import session
+from ftw.builder.once import canonical_key
 from zope.component.hooks import getSite
 from zope.interface import alsoProvides
+from zope.interface import providedBy
+import copy
 import transaction
 
 
@@ -11,6 +17,139 @@ def create(builder, **kwargs):
     return CREATOR_CHAIN[0](builder, **kwargs)
 
 
+def create_once(builder, **kwargs):
+    """Creates the object unless an equal builder already created an
+    object in this session, in which case this object is returned.
+
+    Builders are equal when they are of the same class and have collected
+    the same state, such as arguments, container, roles and interfaces.
+    Objects created in an aborted transaction are created again.
+    """
+    key = canonical_key(builder, **kwargs)
+    obj = builder.session.created_once.get(key)
+    if obj is None:
+        obj = create(builder, **kwargs)
+        builder.session.created_once.add(key, obj)
+    return obj
+
+
+def create_many(builder, count, vary=None, raw=False):
+    """Creates ``count`` objects using ``builder`` as template.
+
+    For each object a copy of the configured builder is made. The optional
+    ``vary`` callable is called with the builder copy and the index of the
+    object and may change the builder, e.g. in order to set another title.
+    Values passed to the builder are shared between the copies unless they
+    are replaced by ``vary``.
+
+    The objects are reindexed in one pass and committed at most once.
+    Passing ``raw=True`` is the same as calling ``raw()`` on the builder,
+    which creates the objects without firing events. Builders providing a
+    ``create_batch`` method, such as the user builder, create all objects
+    with one ``create_batch`` call in raw mode instead.
+    A lazy sequence of the created objects is returned.
+    """
+    create_batch = raw and getattr(builder, 'create_batch', None)
+    if raw and not create_batch:
+        if getattr(builder, 'raw', None) is None:
+            raise ValueError(
+                'Cannot create "%s" objects in raw mode: the builder supports'
+                ' neither raw() nor create_batch().' % type(builder).__name__)
+        builder = clone_builder(builder).raw()
+
+    objects = CreatedObjects()
+    with builder.session.batch():
+        builders = []
+        for index in range(count):
+            item_builder = clone_builder(builder)
+            if vary is not None:
+                item_builder = vary(item_builder, index) or item_builder
+            if create_batch:
+                builders.append(item_builder)
+            else:
+                objects.append(create(item_builder))
+
+        if create_batch:
+            objects.extend(create_batch(builders))
+    return objects
+
+
+def iter_create(builder_factory, count, savepoint_every=None,
+                gc_every=None, minimize_every=None):
+    """Creates ``count`` objects and yields them one at a time.
+
+    ``builder_factory`` is called with the index of each object and must
+    return the builder. In order to keep memory usage bounded, a savepoint
+    is made after every ``savepoint_every`` objects, so that the created
+    objects can be removed from the ZODB connection cache, which is
+    garbage collected after every ``gc_every`` objects and minimized after
+    every ``minimize_every`` objects.
+    """
+    for index in range(count):
+        builder = builder_factory(index)
+        yield create(builder)
+
+        created = index + 1
+        if savepoint_every and created % savepoint_every == 0:
+            builder.session.flush_indexing()
+            transaction.savepoint(optimistic=True)
+
+        if gc_every and created % gc_every == 0:
+            getSite()._p_jar.cacheGC()
+
+        if minimize_every and created % minimize_every == 0:
+            getSite()._p_jar.cacheMinimize()
+
+
+def clone_builder(builder):
+    """Returns a copy of a builder, so that configuring the copy does not
+    change the original builder.
+    """
+    clone = copy.copy(builder)
+    for name, value in vars(builder).items():
+        if isinstance(value, (dict, list, set)):
+            setattr(clone, name, type(value)(value))
+    return clone
+
+
+class CreatedObjects(object):
+    """A lazy sequence of created objects.
+    Content objects are stored by path and only looked up when accessed,
+    so that they do not need to be kept in memory.
+    """
+
+    def __init__(self):
+        self._items = []
+
+    def append(self, obj):
+        if IContentish.providedBy(obj):
+            self._items.append((True, obj.getPhysicalPath()))
+        else:
+            self._items.append((False, obj))
+
+    def extend(self, objects):
+        for obj in objects:
+            self.append(obj)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._resolve(item) for item in self._items[index]]
+        return self._resolve(self._items[index])
+
+    def __iter__(self):
+        for item in self._items:
+            yield self._resolve(item)
+
+    def _resolve(self, item):
+        is_path, value = item
+        if not is_path:
+            return value
+        return getSite().unrestrictedTraverse(value)
+
+
 def ticking_creator(clock, **forward):
     """Returns a builder create()-callable, which "ticks" an
     ftw.testing clock forward after each created object.
@@ -132,7 +271,7 @@ class PloneObjectBuilder(object):
     def after_create(self, obj):
         if self.interfaces:
             alsoProvides(obj, *self.interfaces)
-            obj.reindexObject(idxs=['object_provides'])
+            self.session.reindex(obj, 'object_provides')
 
         self.change_workflow_state(obj)
 
@@ -142,8 +281,9 @@ class PloneObjectBuilder(object):
         if self.creation_date:
             self.set_creation_date(obj)
 
-        if self.session.auto_commit:
-            transaction.commit()
+        self.session.flush_indexing(obj)
+
+        self.session.maybe_commit()
 
     def set_properties(self, obj):
         for property_args in self.properties:
@@ -154,7 +294,7 @@ class PloneObjectBuilder(object):
             return
 
         wftool = getToolByName(self.container, 'portal_workflow')
-        chain = wftool.getChainFor(obj)
+        chain = self.get_workflow_chain(wftool, obj)
         if len(chain) != 1:
             raise ValueError(
                 'Cannot change state of "%s" object - seems to have no'
@@ -167,18 +307,79 @@ class PloneObjectBuilder(object):
             'actor': ''})
 
         for workflow_id in chain:
+            self.update_role_mappings(wftool, workflow_id, obj)
+
+        self.reindex_security(obj)
+        self.session.reindex(obj, 'review_state')
+
+    def get_workflow_chain(self, wftool, obj):
+        """Returns the workflow chain of the object.
+        The chains are cached on the session per portal_type, container
+        and provided interfaces of the object.
+        """
+        key = (obj.portal_type,
+               self.container.getPhysicalPath(),
+               providedBy(aq_base(obj)))
+        if key not in self.session.workflow_chains:
+            self.session.workflow_chains[key] = tuple(
+                wftool.getChainFor(obj))
+        return self.session.workflow_chains[key]
+
+    def update_role_mappings(self, wftool, workflow_id, obj):
+        """Updates the role mappings of the object for the new state.
+        The permission-to-roles maps of DCWorkflow states are cached on the
+        session per workflow and state; other workflows update the role
+        mappings themselves.
+        """
+        key = (workflow_id, self.review_state)
+        if key not in self.session.workflow_role_mappings:
+            self.session.workflow_role_mappings[key] = \
+                self.get_permission_roles(wftool.get(workflow_id))
+
+        permission_roles = self.session.workflow_role_mappings[key]
+        if permission_roles is None:
             workflow = wftool.get(workflow_id)
             if hasattr(aq_base(workflow), 'updateRoleMappingsFor'):
                 workflow.updateRoleMappingsFor(obj)
+            return
+
+        for permission, roles in permission_roles:
+            modifyRolesForPermission(obj, permission, roles)
+
+    def get_permission_roles(self, workflow):
+        """Returns the permission and roles pairs of the builder's review
+        state, or ``None`` when they cannot be precomputed.
+        """
+        if not isinstance(aq_base(workflow), DCWorkflowDefinition):
+            return None
+
+        if workflow.getGroups() and workflow.getRoles():
+            return None
+
+        state = workflow.states.get(self.review_state)
+        if state is None:
+            return ()
 
-        obj.reindexObjectSecurity()
-        obj.reindexObject(idxs=['review_state'])
+        permission_roles = state.permission_roles or {}
+        return tuple((permission, permission_roles.get(permission, []))
+                     for permission in workflow.permissions)
+
+    def reindex_security(self, obj):
+        """Reindexes the security indexes of a created object.
+        As long as the object has no children, the security indexes are
+        updated together with the other indexes of the object.
+        """
+        if getattr(aq_base(obj), 'objectIds', None) and obj.objectIds():
+            obj.reindexObjectSecurity()
+        else:
+            self.session.reindex(obj, *getattr(
+                obj, '_cmf_security_indexes', ('allowedRolesAndUsers',)))
 
     def set_modification_date(self, obj):
         obj.setModificationDate(
             modification_date=self.modification_date)
-        obj.reindexObject(idxs=['modified'])
+        self.session.reindex(obj, 'modified')
 
     def set_creation_date(self, obj):
         obj.setCreationDate(creation_date=self.creation_date)
-        obj.reindexObject(idxs=['created'])
+        self.session.reindex(obj, 'created')
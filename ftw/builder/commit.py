@@ -0,0 +1,65 @@
+from time import time
+
+
+class CommitPolicy(object):
+    """A commit policy decides when the session commits the transaction
+    after objects were created.
+    The base policy commits after every created object, which is what
+    ``auto_commit`` does.
+    """
+
+    def __init__(self):
+        self.pending = 0
+
+    def created(self):
+        """Register a created object and return ``True`` when the
+        transaction should be committed now.
+        """
+        self.pending += 1
+        return self.should_commit()
+
+    def should_commit(self):
+        return True
+
+    def committed(self):
+        self.pending = 0
+
+
+class CommitEveryNCreations(CommitPolicy):
+    """Commits after every ``count`` created objects.
+    """
+
+    def __init__(self, count):
+        super(CommitEveryNCreations, self).__init__()
+        self.count = count
+
+    def should_commit(self):
+        return self.pending >= self.count
+
+
+class CommitAfterSeconds(CommitPolicy):
+    """Commits when ``seconds`` have elapsed since the last commit.
+    """
+
+    def __init__(self, seconds):
+        super(CommitAfterSeconds, self).__init__()
+        self.seconds = seconds
+        self.last_commit = time()
+
+    def should_commit(self):
+        return time() - self.last_commit >= self.seconds
+
+    def committed(self):
+        super(CommitAfterSeconds, self).committed()
+        self.last_commit = time()
+
+
+class LazyCommit(CommitPolicy):
+    """Never commits while creating objects.
+    The pending objects are committed by ``BuilderSession.commit_pending``,
+    which must be called before doing a browser request or reading from a
+    new ZODB connection.
+    """
+
+    def should_commit(self):
+        return False
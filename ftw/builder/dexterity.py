@@ -1,6 +1,10 @@
 from Acquisition import aq_base
+from collections import namedtuple
+from collections import OrderedDict
 from ftw.builder import HAS_RELATION
 from ftw.builder.builder import PloneObjectBuilder
+from ftw.builder.naming import normalize_url_name
+from plone.app.content.interfaces import INameFromTitle
 from plone.app.dexterity.behaviors.metadata import IOwnership
 from plone.dexterity.interfaces import IDexterityFTI
 from plone.dexterity.utils import addContentToContainer
@@ -12,7 +16,10 @@ from zope.component import createObject
 from zope.component import getUtility
 from zope.component import queryMultiAdapter
 from zope.component import queryUtility
+from zope.container.interfaces import INameChooser
 from zope.event import notify
+from zope.interface import providedBy
+from zope.lifecycleevent import ObjectAddedEvent
 from zope.lifecycleevent import ObjectCreatedEvent
 from zope.schema import getFieldsInOrder
 import six
@@ -25,6 +32,12 @@ if HAS_RELATION:
     from zope.intid.interfaces import IIntIds
 
 none_marker = object()
+dynamic_marker = object()
+
+
+PlannedField = namedtuple(
+    'PlannedField',
+    ('name', 'field', 'interface', 'relation', 'missing_value'))
 
 
 class DexterityBuilder(PloneObjectBuilder):
@@ -35,6 +48,8 @@ class DexterityBuilder(PloneObjectBuilder):
         super(DexterityBuilder, self).__init__(session)
         self.checkConstraints = False
         self.set_default_values = True
+        self.deferred_relations = []
+        self.raw_subscribers = None
 
     @property
     def creation_arguments(self):
@@ -52,6 +67,17 @@ class DexterityBuilder(PloneObjectBuilder):
         self.checkConstraints = True
         return self
 
+    def raw(self, *subscribers):
+        """Create the object without firing any events.
+        The object is added to the container with suppressed events and
+        cataloged when the indexing is flushed. No other subscribers run
+        (no workflow initialization, no intid registration, no constraint
+        checks), except for the ``subscribers`` passed, which are called
+        with the object and an ``ObjectAddedEvent``.
+        """
+        self.raw_subscribers = subscribers
+        return self
+
     def create(self):
         self.before_create()
         obj = self.create_object()
@@ -89,22 +115,61 @@ class DexterityBuilder(PloneObjectBuilder):
         # Acquisition wrap content temporarily to make sure schema
         # interfaces can be adapted to `content`
         content = content.__of__(self.container)
-        self.set_field_values(content)
-        self.set_missing_values_for_empty_fields(content)
+        self.set_all_field_values(content)
         self.set_properties(content)
         # Remove temporary acquisition wrapper
         content = aq_base(content)
-        notify(ObjectCreatedEvent(content))
 
-        obj = addContentToContainer(
-            self.container,
-            content,
-            checkConstraints=self.checkConstraints)
+        if self.raw_subscribers is not None:
+            obj = self._add_content_raw(content)
+        else:
+            if not getattr(content, 'id', None):
+                content.id = self.choose_name(content)
+            notify(ObjectCreatedEvent(content))
+            obj = addContentToContainer(
+                self.container,
+                content,
+                checkConstraints=self.checkConstraints)
+
+        if self.deferred_relations:
+            # The values are set after adding the object, so that the added
+            # event does not update the relation catalog.
+            for interface, field, value in self.deferred_relations:
+                field.set(interface(obj), value)
+            self.session.relations.add(obj)
+
+        return obj
 
+    def choose_name(self, content):
+        chooser = INameChooser(self.container)
+        name = getattr(content, 'id', None)
+        if name:
+            return chooser.chooseName(name, content)
+
+        name_from_title = INameFromTitle(content, None)
+        name = (getattr(name_from_title, 'title', None)
+                or getattr(content, 'portal_type', None)
+                or content.__class__.__name__)
+        return self.session.id_allocator.allocate(
+            self.container, name,
+            lambda: chooser.chooseName(None, content),
+            normalize_url_name)
+
+    def _add_content_raw(self, content):
+        name = self.choose_name(content)
+        content.id = name
+        name = self.container._setObject(name, content, suppress_events=True)
+        obj = self.container._getOb(name)
+
+        event = ObjectAddedEvent(obj, self.container, name)
+        for subscriber in self.raw_subscribers:
+            subscriber(obj, event)
+
+        self.session.index(obj)
         return obj
 
     def insert_field_default_values(self):
-        for name, field in self.iter_fields():
+        for name, field, _, _, _ in self.field_plan:
             if name in self.arguments:
                 continue
 
@@ -112,52 +177,106 @@ class DexterityBuilder(PloneObjectBuilder):
             if default:
                 self.arguments[name] = default
 
+    def set_all_field_values(self, obj):
+        """Sets the field values and the missing values of empty fields.
+        Subclasses overriding ``set_field_values`` or
+        ``set_missing_values_for_empty_fields`` get both hooks called,
+        otherwise the setter plan is run in one pass.
+        """
+        klass = type(self)
+        if (klass.set_field_values == DexterityBuilder.set_field_values
+                and klass.set_missing_values_for_empty_fields
+                == DexterityBuilder.set_missing_values_for_empty_fields):
+            self.apply_field_values(obj)
+        else:
+            self.set_field_values(obj)
+            self.set_missing_values_for_empty_fields(obj)
+
     def set_field_values(self, obj):
-        for name, field in self.iter_fields(obj):
+        self.apply_field_values(obj, missing_values=False)
 
-            if name in self.arguments:
-                value = self.arguments.get(name)
+    def set_missing_values_for_empty_fields(self, obj):
+        self.apply_field_values(obj, field_values=False)
 
-                if HAS_RELATION and IRelationChoice.providedBy(field):
-                    value = self._as_relation_value(value)
-                elif HAS_RELATION and IRelationList.providedBy(field):
-                    value = [self._as_relation_value(item) for item in value]
+    def apply_field_values(self, obj, field_values=True, missing_values=True):
+        """Runs the setter plan on the object: sets the values of the fields
+        passed to the builder and initializes the other, empty fields with
+        their missing value.
+        Each schema interface is adapted only once per object.
 
-                field.set(field.interface(obj), value)
+        When the session defers relations, the relation values are kept in
+        ``self.deferred_relations`` and set after adding the object.
+        """
+        intids = None
+
+        for interface, planned_fields in self.setter_plan:
+            adapted = interface(obj)
+
+            for name, field, _, relation, missing_value in planned_fields:
+                if name in self.arguments:
+                    if not field_values:
+                        continue
+
+                    value = self.arguments[name]
+                    if relation is not None:
+                        if intids is None:
+                            intids = getUtility(IIntIds)
+                        value = self._as_relation_field_value(
+                            relation, value, intids)
+                        if self.session.defer_relations:
+                            self.deferred_relations.append(
+                                (interface, field, value))
+                            continue
+
+                    field.set(adapted, value)
+                    continue
 
-    def _as_relation_value(self, value):
-        if IRelationValue.providedBy(value):
-            return value
+                if (not missing_values or field.required
+                        or missing_value is none_marker):
+                    continue
 
-        intids = getUtility(IIntIds)
-        return RelationValue(intids.getId(value))
+                try:
+                    if field.get(adapted):
+                        # Field is present, nothing to do
+                        continue
+                except AttributeError:
+                    # Field is missing, go on and set default value
+                    pass
 
-    def set_missing_values_for_empty_fields(self, obj):
-        for name, field in self.iter_fields(obj):
+                field.set(adapted, missing_value)
 
-            if field.required:
-                continue
+    def _as_relation_field_value(self, relation, value, intids):
+        if relation == 'choice':
+            return self._as_relation_value(value, intids)
+        return self._as_relation_values(value, intids)
 
-            try:
-                value = field.get(field.interface(obj))
-                if value:
-                    # Field is present, nothing to do
-                    continue
-            except AttributeError:
-                # Field is missing, go on and set default value
-                pass
+    def _as_relation_values(self, values, intids):
+        return [value if IRelationValue.providedBy(value)
+                else RelationValue(intids.getId(value))
+                for value in values]
 
-            if name in self.arguments:
-                continue
+    def _as_relation_value(self, value, intids=None):
+        if IRelationValue.providedBy(value):
+            return value
 
-            missing_value = self.get_missing_value_for_field(field)
-            if missing_value != none_marker:
-                field.set(field.interface(obj), missing_value)
+        if intids is None:
+            intids = getUtility(IIntIds)
+        return RelationValue(intids.getId(value))
 
     def get_default_value_for_field(self, field):
-        default = queryMultiAdapter(
-            (self.container, self.container.REQUEST, None, field, None),
-            IValue, name='default')
+        # Whether there is a default value adapter and the static default
+        # values of fields are memoized on the session. Defaults provided
+        # by an adapter or a default factory are evaluated each time.
+        cache_key = self._get_default_value_cache_key(field)
+        cached = self.session.default_values.get(cache_key, none_marker)
+        if cached is not none_marker and cached is not dynamic_marker:
+            return cached
+
+        default = None
+        if cached is none_marker:
+            default = queryMultiAdapter(
+                (self.container, self.container.REQUEST, None, field, None),
+                IValue, name='default')
 
         if default is not None:
             value = default.get()
@@ -174,14 +293,86 @@ class DexterityBuilder(PloneObjectBuilder):
         # the field interface additionally.
         if IOwnership['creators'] == field and field.interface == IOwnership:
             value = tuple(map(six.ensure_text, value))
+
+        if default is None:
+            if getattr(field, 'defaultFactory', None) is None:
+                self.session.default_values[cache_key] = value
+            else:
+                self.session.default_values[cache_key] = dynamic_marker
+
         return value
 
+    def _get_default_value_cache_key(self, field):
+        return (self.portal_type,
+                field.interface,
+                field.__name__,
+                providedBy(aq_base(self.container)),
+                providedBy(self.container.REQUEST))
+
     def get_missing_value_for_field(self, field):
         try:
             return field.missing_value
         except AttributeError:
             return none_marker
 
+    @property
+    def field_plan(self):
+        """The field plan lists the writable fields of the schema and the
+        behaviors of the portal_type in order, together with their interface,
+        the kind of relation and the missing value.
+
+        The plan is cached on the session per builder class and portal_type
+        and recomputed when the schema or the behaviors of the FTI change.
+        """
+        return self._get_plans()[0]
+
+    @property
+    def setter_plan(self):
+        """The setter plan groups the fields of the field plan by their
+        schema interface, so that each interface only needs to be adapted
+        once per object.
+        """
+        return self._get_plans()[1]
+
+    def _get_plans(self):
+        key = (type(self), self.portal_type)
+        fingerprint = self.get_fti_fingerprint()
+        cached = self.session.field_plans.get(key)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1:]
+
+        plan = tuple(self.plan_field(name, field)
+                     for name, field in self.iter_fields())
+
+        setters = OrderedDict()
+        for planned in plan:
+            setters.setdefault(planned.interface, []).append(planned)
+        setters = tuple((interface, tuple(planned_fields))
+                        for interface, planned_fields in setters.items())
+
+        self.session.field_plans[key] = (fingerprint, plan, setters)
+        return plan, setters
+
+    def plan_field(self, name, field):
+        relation = None
+        if HAS_RELATION and IRelationChoice.providedBy(field):
+            relation = 'choice'
+        elif HAS_RELATION and IRelationList.providedBy(field):
+            relation = 'list'
+
+        return PlannedField(name, field, field.interface, relation,
+                            self.get_missing_value_for_field(field))
+
+    def get_fti_fingerprint(self):
+        fti = queryUtility(IDexterityFTI, name=self.portal_type)
+        if fti is None:
+            return None
+
+        return (fti.schema,
+                fti.model_source,
+                fti.model_file,
+                tuple(fti.behaviors))
+
     def iter_fields(self, obj=None):
         if obj:
             schematas = iterSchemata(obj)
@@ -206,4 +397,4 @@ class DexterityBuilder(PloneObjectBuilder):
 
     def set_creation_date(self, obj):
         obj.creation_date = self.creation_date
-        obj.reindexObject(idxs=['created'])
+        self.session.reindex(obj, 'created')
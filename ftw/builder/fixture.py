@@ -0,0 +1,223 @@
+from collections import namedtuple
+from collections import OrderedDict
+from ftw.builder import session
+from ftw.builder.builder import Builder
+from ftw.builder.builder import create
+from ftw.builder.registry import builder_registry
+import hashlib
+import json
+import six
+
+
+RESERVED_KEYS = ('builder', 'name', 'children', 'calls')
+
+_plans = {}
+
+
+Step = namedtuple('Step', ('name', 'builder', 'parent', 'calls'))
+
+
+class Ref(object):
+    """Reference to the object created by the step named ``name``.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return '<Ref %s>' % self.name
+
+
+def load_fixture(path):
+    """Load a JSON fixture file and return its compiled ``FixturePlan``.
+    The compiled plans are cached by the hash of the file content, so that
+    loading the same fixture again does not parse and validate it again.
+    """
+    with open(path, 'rb') as fixture_file:
+        data = fixture_file.read()
+
+    key = hashlib.sha1(data).hexdigest()
+    if key not in _plans:
+        _plans[key] = compile_fixture(json.loads(
+            six.ensure_text(data), object_pairs_hook=OrderedDict))
+        _plans[key].digest = key
+    return _plans[key]
+
+
+def compile_fixture(nodes):
+    """Validate a parsed fixture and compile it into a ``FixturePlan``.
+
+    A fixture is a list of nodes. Each node is an object with the name of
+    the registered ``builder`` and the fluent methods of the builder to
+    call as keys. A list value is passed as positional arguments, an object
+    value as keyword arguments and any other value as single argument.
+    Methods which need positional and keyword arguments or need to be called
+    more than once are listed in ``calls``, a list of objects with one
+    method each, where the value is an object with ``args`` and ``kwargs``.
+
+    A node may have a ``name``, which lets other nodes reference the created
+    object with ``{"$ref": "<name>"}``, and ``children``, a list of nodes
+    created within the object.
+    """
+    steps = []
+    compile_nodes(nodes, None, steps, set())
+    return FixturePlan(steps)
+
+
+def compile_nodes(nodes, parent, steps, names):
+    if not isinstance(nodes, list):
+        raise ValueError('Fixture nodes must be a list, got %r' % (nodes,))
+
+    for node in nodes:
+        compile_node(node, parent, steps, names)
+
+
+def compile_node(node, parent, steps, names):
+    if not isinstance(node, dict) or 'builder' not in node:
+        raise ValueError('Fixture node without builder: %r' % (node,))
+
+    try:
+        builder_klass = builder_registry.get(node['builder'])
+    except KeyError as exc:
+        raise ValueError(exc.args[0])
+
+    name = node.get('name')
+    if name is not None and name in names:
+        raise ValueError('Duplicate fixture node name "%s"' % name)
+
+    if parent is not None and not hasattr(builder_klass, 'within'):
+        raise ValueError('Builder "%s" cannot be used for children'
+                         % node['builder'])
+
+    calls = [compile_call(builder_klass, method, value)
+             for method, value in node.items()
+             if method not in RESERVED_KEYS]
+    for call in node.get('calls', ()):
+        if not isinstance(call, dict) or len(call) != 1:
+            raise ValueError('Fixture calls must have one method each: %r'
+                             % (call,))
+        method, value = list(call.items())[0]
+        calls.append(compile_call(builder_klass, method, value, full=True))
+
+    for _, args, kwargs in calls:
+        for value in list(args) + list(kwargs.values()):
+            for ref in iter_refs(value):
+                if ref.name not in names:
+                    raise ValueError(
+                        'Fixture reference to unknown or later node "%s"'
+                        % ref.name)
+
+    index = len(steps)
+    steps.append(Step(name, node['builder'], parent, tuple(calls)))
+    if name is not None:
+        names.add(name)
+
+    if 'children' in node:
+        compile_nodes(node['children'], index, steps, names)
+
+
+def compile_call(builder_klass, method, value, full=False):
+    if (method.startswith('_') or method.startswith('create')
+            or not callable(getattr(builder_klass, method, None))):
+        raise ValueError('Builder "%s" has no method "%s"' % (
+            builder_klass.__name__, method))
+
+    if full:
+        if not isinstance(value, dict) or set(value) - set(['args',
+                                                           'kwargs']):
+            raise ValueError(
+                'Fixture call of "%s" must have "args" and "kwargs": %r'
+                % (method, value))
+        args = value.get('args', [])
+        kwargs = value.get('kwargs', {})
+    elif isinstance(value, list):
+        args, kwargs = value, {}
+    elif isinstance(value, dict) and '$ref' not in value:
+        args, kwargs = [], value
+    else:
+        args, kwargs = [value], {}
+
+    return (method,
+            tuple(compile_value(arg) for arg in args),
+            dict((str(key), compile_value(arg))
+                 for key, arg in kwargs.items()))
+
+
+def compile_value(value):
+    if isinstance(value, dict):
+        if '$ref' in value:
+            return Ref(value['$ref'])
+        return dict((key, compile_value(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return [compile_value(item) for item in value]
+    return value
+
+
+def iter_refs(value):
+    if isinstance(value, Ref):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            for ref in iter_refs(item):
+                yield ref
+    elif isinstance(value, list):
+        for item in value:
+            for ref in iter_refs(item):
+                yield ref
+
+
+def resolve(value, objects):
+    if isinstance(value, Ref):
+        return objects[value.name]
+    if isinstance(value, dict):
+        return dict((key, resolve(item, objects))
+                    for key, item in value.items())
+    if isinstance(value, list):
+        return [resolve(item, objects) for item in value]
+    return value
+
+
+class FixturePlan(object):
+    """A compiled fixture, which is a flat list of steps in creation order.
+    Each step creates one object with a builder and a precompiled list of
+    method calls.
+    """
+
+    def __init__(self, steps):
+        self.steps = tuple(steps)
+        self.digest = None
+
+    def __len__(self):
+        return len(self.steps)
+
+    def execute(self, within=None):
+        """Create the objects of the fixture within one session batch.
+        Top level objects are created ``within`` the passed container when
+        their builder supports it.
+        A dict mapping the names of the named nodes to the created objects
+        is returned.
+        """
+        created = []
+        objects = OrderedDict()
+
+        with session.current_session.batch():
+            for step in self.steps:
+                builder = Builder(step.builder)
+                if step.parent is not None:
+                    builder.within(created[step.parent])
+                elif within is not None and hasattr(builder, 'within'):
+                    builder.within(within)
+
+                for method, args, kwargs in step.calls:
+                    # Resolving copies the lists and dicts of the cached
+                    # plan, so that builders never share them.
+                    args = resolve(list(args), objects)
+                    kwargs = resolve(kwargs, objects)
+                    getattr(builder, method)(*args, **kwargs)
+
+                obj = create(builder)
+                created.append(obj)
+                if step.name is not None:
+                    objects[step.name] = obj
+
+        return objects
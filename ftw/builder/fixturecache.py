@@ -0,0 +1,201 @@
+from ftw.builder.fixture import FixturePlan
+from ftw.builder.registry import builder_registry
+from ZODB.blob import is_blob_record
+from ZODB.DB import DB
+from ZODB.DemoStorage import DemoStorage
+from ZODB.FileStorage import FileStorage
+from ZODB.serialize import referencesf
+from ZODB.utils import z64
+import errno
+import functools
+import hashlib
+import inspect
+import json
+import os
+import re
+import shutil
+import six
+import tempfile
+
+try:
+    from ZODB.Connection import TransactionMetaData
+except ImportError:
+    # ZODB < 5.4 stores with transaction objects.
+    from transaction import Transaction as TransactionMetaData
+
+
+CACHE_DIRECTORY_ENV = 'FTW_BUILDER_FIXTURE_CACHE'
+
+
+def get_cache_directory():
+    """The fixture cache directory is configured with the environment
+    variable ``FTW_BUILDER_FIXTURE_CACHE`` and defaults to a directory in
+    the system's temp directory.
+    """
+    return os.environ.get(CACHE_DIRECTORY_ENV) or os.path.join(
+        tempfile.gettempdir(), 'ftw.builder-fixtures')
+
+
+def get_source(fixture):
+    """Returns a deterministic representation of the fixture for the cache
+    key: the digest or the steps of a fixture plan, the source of a function
+    or the source and the arguments of a ``functools.partial``.
+    Fixtures without such a representation cannot be cached.
+    """
+    if isinstance(fixture, FixturePlan):
+        return fixture.digest or json.dumps(
+            fixture.steps, sort_keys=True, default=repr)
+
+    try:
+        if isinstance(fixture, functools.partial):
+            return get_source(fixture.func) + json.dumps(
+                [fixture.args, fixture.keywords], sort_keys=True)
+        return inspect.getsource(fixture)
+    except (IOError, TypeError):
+        raise ValueError(
+            'Cannot cache fixture %r: its source is not available.'
+            % (fixture,))
+
+
+def get_builder_source(builder_klass):
+    try:
+        return inspect.getsource(builder_klass)
+    except (IOError, TypeError):
+        return '.'.join((builder_klass.__module__, builder_klass.__name__))
+
+
+def fixture_cache_key(fixture, portal):
+    """Returns a hash of the fixture, the registered builders and the
+    profile versions installed in the portal.
+    A cached fixture is outdated as soon as one of them changes.
+    """
+    digest = hashlib.sha1()
+
+    def update(value):
+        digest.update(six.ensure_binary(value))
+
+    update(get_source(fixture))
+    for name, builder_klass in sorted(builder_registry.builders.items()):
+        update(name)
+        update(builder_klass.__module__)
+        update(get_builder_source(builder_klass))
+
+    portal_setup = portal.portal_setup
+    for profile, version in sorted(
+            portal_setup._profile_upgrade_versions.items()):
+        update(repr((profile, version)))
+    return digest.hexdigest()
+
+
+def get_cache_paths(name, key):
+    basename = '{0}-{1}'.format(name.replace(':', '-'), key)
+    directory = get_cache_directory()
+    return (os.path.join(directory, basename + '.fs'),
+            os.path.join(directory, basename + '.blobs'))
+
+
+def prune_snapshots(name, key):
+    """Remove the snapshots of the layer ``name`` with other keys than
+    ``key``, which are outdated, and the temporary files of test runs of
+    this layer which crashed while writing a snapshot.
+    """
+    directory = get_cache_directory()
+    if not os.path.isdir(directory):
+        return
+
+    pattern = re.compile(
+        r'^{0}-(?P<key>[0-9a-f]{{40}})\.(fs|blobs)'
+        r'(\.(?P<pid>\d+)\.tmp)?(\.index|\.lock|\.tmp)?$'.format(
+            re.escape(name.replace(':', '-'))))
+    for filename in os.listdir(directory):
+        match = pattern.match(filename)
+        if match is None:
+            continue
+
+        pid = match.group('pid')
+        if pid is None and match.group('key') == key:
+            continue
+        if pid is not None and is_running(int(pid)):
+            continue
+
+        path = os.path.join(directory, filename)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+
+
+def is_running(pid):
+    if pid == os.getpid():
+        return True
+
+    try:
+        os.kill(pid, 0)
+    except OSError as exc:
+        return exc.errno == errno.EPERM
+    return True
+
+
+def snapshot_storage(storage, path, blob_dir):
+    """Copy all records reachable from the root of ``storage`` into a new
+    FileStorage at ``path``. The file is written to a temporary location
+    first, so that concurrent test runs never see incomplete files.
+    """
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    tmp_path = '{0}.{1}.tmp'.format(path, os.getpid())
+    tmp_blob_dir = '{0}.{1}.tmp'.format(blob_dir, os.getpid())
+    target = FileStorage(tmp_path, create=True, blob_dir=tmp_blob_dir)
+    try:
+        txn = TransactionMetaData()
+        target.tpc_begin(txn)
+        copy_records(storage, target, txn)
+        target.tpc_vote(txn)
+        target.tpc_finish(txn)
+    finally:
+        target.close()
+
+    # The index written on close is kept: the read-only FileStorage of the
+    # later test runs cannot write it and would scan the whole file.
+    if os.path.exists(tmp_path + '.index'):
+        os.rename(tmp_path + '.index', path + '.index')
+    os.rename(tmp_path, path)
+    if os.path.exists(blob_dir):
+        shutil.rmtree(tmp_blob_dir)
+    else:
+        os.rename(tmp_blob_dir, blob_dir)
+
+    for suffix in ('.lock', '.tmp'):
+        if os.path.exists(tmp_path + suffix):
+            os.remove(tmp_path + suffix)
+
+
+def copy_records(source, target, txn):
+    seen = set([z64])
+    pending = [z64]
+    while pending:
+        oid = pending.pop()
+        data, serial = source.load(oid, '')
+
+        if is_blob_record(data):
+            handle, blob_path = tempfile.mkstemp()
+            os.close(handle)
+            shutil.copyfile(source.loadBlob(oid, serial), blob_path)
+            target.storeBlob(oid, z64, data, blob_path, '', txn)
+        else:
+            target.store(oid, z64, data, '', txn)
+
+        for ref in referencesf(data):
+            if ref not in seen:
+                seen.add(ref)
+                pending.append(ref)
+
+
+def open_snapshot(path, blob_dir, name):
+    """Open a snapshot read-only with a DemoStorage on top, which takes the
+    changes of the tests.
+    """
+    base = FileStorage(path, read_only=True, blob_dir=blob_dir)
+    return DB(DemoStorage(name=name, base=base, close_base_on_close=True))
@@ -1,9 +1,7 @@
 from Products.CMFCore.utils import getToolByName
 from ftw.builder import builder_registry
 from plone.i18n.normalizer.interfaces import IIDNormalizer
-from zope.component import getUtility
 from zope.component.hooks import getSite
-import transaction
 
 
 class GroupBuilder(object):
@@ -54,17 +52,20 @@ class GroupBuilder(object):
         return portal_groups.getGroupById(self.groupid)
 
     def add_members(self, group):
-        portal_groups = getToolByName(self.portal, 'portal_groups')
-        for member in self.members:
-            portal_groups.addPrincipalToGroup(member.getId(), group.getId())
+        if self.members:
+            self.session.add_group_members(
+                group.getId(), [member.getId() for member in self.members])
 
     def before_create(self):
         self.validate()
         self.update_group_id()
 
     def after_create(self, group):
-        if self.session.auto_commit:
-            transaction.commit()
+        if not self.session.defer_group_memberships:
+            self.session.flush_group_memberships()
+        if not self.session.defer_indexing:
+            self.session.flush_indexing()
+        self.session.maybe_commit()
 
     def validate(self):
         assert self.groupid or self.properties.get('title', None), \
@@ -75,13 +76,12 @@ class GroupBuilder(object):
             return
 
         title = self.properties.get('title')
-        normalizer = getUtility(IIDNormalizer)
-        self.groupid = normalizer.normalize(title)
+        self.groupid = self.session.names.normalize(IIDNormalizer, title)
 
     def set_roles(self, groupid):
         for context, roles in self.local_roles.items():
             context.manage_setLocalRoles(groupid, tuple(roles))
-            context.reindexObjectSecurity()
+            self.session.reindex_security(context)
 
 
 builder_registry.register('group', GroupBuilder)
@@ -0,0 +1,165 @@
+from Acquisition import aq_base
+from zope.component.hooks import getSite
+import transaction
+
+
+try:
+    from Products.CMFCore.indexing import processQueue
+except ImportError:
+    # Products.CMFCore < 2.4 has no indexing queue.
+    def processQueue():
+        pass
+
+
+def is_in_site(obj):
+    """Returns ``True`` when the object is still reachable by its path,
+    i.e. it was neither deleted nor moved in the meantime.
+    """
+    path = '/'.join(obj.getPhysicalPath())
+    found = getSite().unrestrictedTraverse(path, None)
+    return found is not None and aq_base(found) is aq_base(obj)
+
+
+class DeferredQueue(object):
+    """Base class for queues of deferred work. Subclasses implement
+    ``flush``, which processes the queued work, and ``clear``, which drops
+    it.
+
+    The queue is flushed at the latest before the transaction is committed.
+    The queue is registered as transaction synchronizer and cleared when the
+    transaction is aborted, so that the work of rolled back objects is not
+    done in a later transaction.
+    """
+
+    def __init__(self):
+        self.defer = False
+        self._hooked_transaction = None
+        self._registered = False
+        self._committing = False
+
+    def _hook_into_transaction(self):
+        # Deferred work must not get lost when the transaction
+        # is committed before the queue is flushed explicitly.
+        if not self._registered:
+            transaction.manager.registerSynch(self)
+            self._registered = True
+
+        txn = transaction.get()
+        if txn is self._hooked_transaction:
+            return
+
+        self._hooked_transaction = txn
+        txn.addBeforeCommitHook(self._before_commit)
+
+    def _before_commit(self):
+        self.flush()
+        self._committing = True
+
+    def beforeCompletion(self, txn):
+        pass
+
+    def afterCompletion(self, txn):
+        committing, self._committing = self._committing, False
+        self._hooked_transaction = None
+        if not committing:
+            self.clear()
+
+    def newTransaction(self, txn):
+        pass
+
+
+class ReindexCollector(DeferredQueue):
+    """The reindex collector gathers catalog reindex requests of builders
+    and processes them with a single ``reindexObject`` call per object.
+
+    The index names requested for the same object are merged, so that an
+    object which requests ``object_provides``, ``review_state`` and
+    ``modified`` in one ``create()`` is only reindexed once.
+
+    When ``defer`` is enabled, the collected requests of all builders are
+    kept until ``flush`` is called without an object or the transaction is
+    committed. They are then processed in one pass, ordered by path, skipping
+    objects which were deleted in the meantime.
+    """
+
+    def __init__(self):
+        super(ReindexCollector, self).__init__()
+        self._queue = {}
+        self._security = {}
+
+    def __len__(self):
+        return len(self._queue) + len(self._security)
+
+    def reindex(self, obj, idxs):
+        key = id(aq_base(obj))
+        if key not in self._queue:
+            self._queue[key] = (obj, set(idxs))
+            self._hook_into_transaction()
+        elif self._queue[key][1] is not None:
+            self._queue[key][1].update(idxs)
+
+    def index(self, obj):
+        """Request indexing the object with all indexes, e.g. because it is
+        not yet cataloged.
+        """
+        key = id(aq_base(obj))
+        if key not in self._queue:
+            self._hook_into_transaction()
+        self._queue[key] = (obj, None)
+
+    def reindex_security(self, obj):
+        """Request reindexing the security of the object and its subtree,
+        e.g. after changing local roles.
+        """
+        self._hook_into_transaction()
+        self._security[obj.getPhysicalPath()] = obj
+
+    def flush(self, obj=None):
+        """Reindex the queued objects.
+        When an object is passed, only this object is reindexed unless the
+        collector is deferring; otherwise all queued objects are reindexed.
+        """
+        if obj is not None:
+            if self.defer:
+                return
+            entry = self._queue.pop(id(aq_base(obj)), None)
+            entries = entry and [entry] or []
+        else:
+            self.flush_security()
+            entries = [entry for entry in self._queue.values()
+                       if is_in_site(entry[0])]
+            entries.sort(key=lambda entry: entry[0].getPhysicalPath())
+            self._queue.clear()
+
+        for entry_obj, idxs in entries:
+            if idxs is None:
+                entry_obj.indexObject()
+            else:
+                entry_obj.reindexObject(idxs=sorted(idxs))
+
+        if obj is None and entries:
+            # The flush may run as before-commit hook after the indexing
+            # queue has already been processed for this transaction.
+            processQueue()
+
+    def flush_security(self):
+        """Reindex the security of the queued subtrees.
+        Subtrees contained in another queued subtree are skipped, since
+        reindexing the security of the outer subtree covers them.
+        """
+        roots = []
+        for path in sorted(self._security):
+            if any(path[:len(root)] == root for root in roots):
+                continue
+            roots.append(path)
+
+        objects = [self._security[path] for path in roots]
+        self._security.clear()
+
+        for obj in objects:
+            if is_in_site(obj):
+                obj.reindexObjectSecurity()
+
+    def clear(self):
+        self._queue.clear()
+        self._security.clear()
@@ -0,0 +1,64 @@
+from Acquisition import aq_base
+from collections import OrderedDict
+from ftw.builder.indexing import DeferredQueue
+from Products.CMFCore.utils import getToolByName
+from Products.PluggableAuthService.interfaces.plugins import IGroupsPlugin
+from zope.component.hooks import getSite
+
+
+def get_group_storage_plugin(acl_users):
+    """Returns the group plugin storing the memberships in BTrees, such as
+    the ``ZODBGroupManager``, or ``None`` when there is none.
+    """
+    for _, plugin in acl_users.plugins.listPlugins(IGroupsPlugin):
+        base = aq_base(plugin)
+        if (getattr(base, '_principal_groups', None) is not None
+                and getattr(base, '_groups', None) is not None):
+            return plugin
+    return None
+
+
+class GroupMembershipQueue(DeferredQueue):
+    """The group membership queue collects the principals to add to groups
+    and writes them group by group directly to the BTrees of the group
+    plugin, without a PAS round trip per membership.
+
+    Groups which are not stored in this plugin are populated with
+    ``portal_groups.addPrincipalToGroup``.
+    """
+
+    def __init__(self):
+        super(GroupMembershipQueue, self).__init__()
+        self._queue = OrderedDict()
+
+    def __len__(self):
+        return sum(map(len, self._queue.values()))
+
+    def add(self, groupid, principal_ids):
+        self._hook_into_transaction()
+        self._queue.setdefault(groupid, []).extend(principal_ids)
+
+    def clear(self):
+        self._queue.clear()
+
+    def flush(self):
+        memberships, self._queue = self._queue, OrderedDict()
+        if not memberships:
+            return
+
+        site = getSite()
+        plugin = get_group_storage_plugin(getToolByName(site, 'acl_users'))
+        portal_groups = getToolByName(site, 'portal_groups')
+
+        for groupid, principal_ids in memberships.items():
+            if plugin is None or plugin._groups.get(groupid) is None:
+                for principal_id in principal_ids:
+                    portal_groups.addPrincipalToGroup(principal_id, groupid)
+                continue
+
+            for principal_id in principal_ids:
+                current = plugin._principal_groups.get(principal_id, ())
+                if groupid in current:
+                    continue
+                plugin._principal_groups[principal_id] = current + (groupid,)
+                plugin._invalidatePrincipalCache(principal_id)
@@ -0,0 +1,125 @@
+from Acquisition import aq_base
+from plone.i18n.normalizer.interfaces import IIDNormalizer
+from plone.i18n.normalizer.interfaces import IURLNormalizer
+from zope.component import getUtility
+import re
+
+
+# Name choosers put the counter before a file extension: "test-1.doc".
+FILENAME_REGEX = re.compile(r'^(.*)\.(\w+)$')
+
+
+def normalize_url_name(name):
+    return getUtility(IURLNormalizer).normalize(name)
+
+
+def normalize_id_name(name):
+    return getUtility(IIDNormalizer).normalize(name)
+
+
+class IdAllocator(object):
+    """The id allocator chooses ids for many objects with the same name in
+    the same container in constant time.
+
+    Name choosers probe ``name``, ``name-1``, ``name-2``, ... until a free id
+    is found, which gets slow when a container is filled with many objects
+    of the same name. The allocator uses the name chooser only for the first
+    object per container and name and remembers a counter for the following
+    objects.
+    """
+
+    def __init__(self):
+        self._counters = {}
+
+    def allocate(self, container, name, choose, normalize, is_taken=None):
+        """Returns a free id for an object named ``name`` in ``container``.
+
+        ``choose`` is called without arguments for the first object and must
+        return the id chosen by the name chooser. ``normalize`` must convert
+        ``name`` the same way the name chooser does. When the chosen id is
+        not derived from the normalized name, the allocator falls back to the
+        name chooser for this name.
+        ``is_taken`` is called with an id and must tell whether the id is
+        already used in the container.
+        """
+        if is_taken is None:
+            def is_taken(candidate):
+                return getattr(aq_base(container), candidate, None) is not None
+
+        key = (id(aq_base(container)), name)
+        if key not in self._counters:
+            chosen = choose()
+            base = normalize(name)
+            self._counters[key] = (aq_base(container), base,
+                                   self._next_index(chosen, base))
+            return chosen
+
+        container_base, base, index = self._counters[key]
+        if index is None:
+            return choose()
+
+        candidate = self._numbered(base, index)
+        while is_taken(candidate):
+            index += 1
+            candidate = self._numbered(base, index)
+
+        self._counters[key] = (container_base, base, index + 1)
+        return candidate
+
+    def _split_extension(self, base):
+        match = FILENAME_REGEX.match(base)
+        if match is None:
+            return base, ''
+        root, extension = match.groups()
+        return root, '.' + extension
+
+    def _numbered(self, base, index):
+        root, extension = self._split_extension(base)
+        return '%s-%d%s' % (root, index, extension)
+
+    def _next_index(self, chosen, base):
+        if chosen == base:
+            return 1
+
+        root, extension = self._split_extension(base)
+        prefix = root + '-'
+        if (not chosen.startswith(prefix) or not chosen.endswith(extension)
+                or len(chosen) <= len(prefix) + len(extension)):
+            return None
+
+        number = chosen[len(prefix):len(chosen) - len(extension)]
+        if number.isdigit():
+            return int(number) + 1
+        return None
+
+
+class NameMemo(object):
+    """The name memo caches normalizer utilities and normalized names for
+    the lifetime of a builder session, so that generating many users or
+    groups with repeated names normalizes each name only once.
+    """
+
+    def __init__(self):
+        self._utilities = {}
+        self._names = {}
+
+    def utility(self, interface):
+        if interface not in self._utilities:
+            self._utilities[interface] = getUtility(interface)
+        return self._utilities[interface]
+
+    def normalize(self, interface, name):
+        """Normalize ``name`` with the normalizer utility providing
+        ``interface``.
+        """
+        normalizer = self.utility(interface)
+        return self.memoize(interface, name, normalizer.normalize)
+
+    def memoize(self, key, name, function):
+        """Returns ``function(name)``, which is computed only once per
+        ``key`` and ``name``.
+        """
+        cache_key = (key, name)
+        if cache_key not in self._names:
+            self._names[cache_key] = function(name)
+        return self._names[cache_key]
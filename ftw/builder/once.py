@@ -0,0 +1,115 @@
+from Acquisition import aq_base
+from ftw.builder.indexing import is_in_site
+from Products.CMFCore.interfaces import IContentish
+from zope.interface.interface import InterfaceClass
+import transaction
+
+
+def canonical_key(builder, **kwargs):
+    """Returns a hashable key of the builder's class and its collected
+    state, such as the arguments, the container, the roles and the
+    interfaces. Objects with a physical path are represented by their
+    path and interfaces by their identifier.
+    """
+    state = dict((name, value) for name, value in vars(builder).items()
+                 if name != 'session')
+    return (type(builder), canonical(state), canonical(kwargs))
+
+
+def canonical(value):
+    if isinstance(value, InterfaceClass):
+        return ('interface', value.__identifier__)
+    if getattr(aq_base(value), 'getPhysicalPath', None) is not None:
+        return ('path', value.getPhysicalPath())
+    if isinstance(value, dict):
+        return ('dict', tuple(sorted(
+            ((canonical(key), canonical(item))
+             for key, item in value.items()), key=repr)))
+    if isinstance(value, (set, frozenset)):
+        return ('set', tuple(sorted(map(canonical, value), key=repr)))
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__, tuple(map(canonical, value)))
+
+    try:
+        hash(value)
+    except TypeError:
+        return ('repr', repr(value))
+    return value
+
+
+class OnceMemo(object):
+    """The memo of ``create_once`` maps canonical builder keys to the
+    created objects.
+
+    Objects created in a transaction which is aborted or fails to commit
+    are dropped, so that they are created again. Deleted content objects
+    are dropped as well. The memo is registered as transaction synchronizer
+    in order to notice aborts and hooks into each transaction adding
+    objects in order to notice commits.
+    """
+
+    def __init__(self):
+        self._objects = {}
+        self._pending = []
+        self._registered = False
+        self._hooked_transaction = None
+        self._committing = False
+
+    def __len__(self):
+        return len(self._objects)
+
+    def get(self, key):
+        obj = self._objects.get(key)
+        if (obj is not None and IContentish.providedBy(obj)
+                and not is_in_site(obj)):
+            del self._objects[key]
+            return None
+        return obj
+
+    def add(self, key, obj):
+        if not self._registered:
+            transaction.manager.registerSynch(self)
+            self._registered = True
+
+        txn = transaction.get()
+        if txn is not self._hooked_transaction:
+            # Objects of an earlier transaction, whose commit failed in a
+            # before commit hook, were never committed.
+            self._drop_pending()
+            self._committing = False
+            self._hooked_transaction = txn
+            txn.addBeforeCommitHook(self._before_commit)
+            txn.addAfterCommitHook(self._after_commit)
+
+        self._objects[key] = obj
+        self._pending.append(key)
+
+    def _before_commit(self):
+        self._committing = True
+
+    def _after_commit(self, success):
+        self._committing = False
+        self._hooked_transaction = None
+        if success:
+            self._pending = []
+        else:
+            self._drop_pending()
+
+    def _drop_pending(self):
+        pending, self._pending = self._pending, []
+        for key in pending:
+            self._objects.pop(key, None)
+
+    def beforeCompletion(self, txn):
+        pass
+
+    def afterCompletion(self, txn):
+        # Commits are completed by the after commit hook.
+        if self._committing:
+            return
+
+        self._hooked_transaction = None
+        self._drop_pending()
+
+    def newTransaction(self, txn):
+        pass
@@ -1,4 +1,5 @@
 from ftw.builder import builder_registry
+from ftw.builder.naming import normalize_id_name
 from plone.app.portlets.portlets import navigation
 from plone.portlet.static import static
 from plone.portlets.interfaces import IPortletAssignmentMapping
@@ -6,7 +7,6 @@ from plone.portlets.interfaces import IPortletManager
 from zope.component import getUtility, getMultiAdapter
 from zope.component.hooks import getSite
 from zope.container.interfaces import INameChooser
-import transaction
 
 
 class PlonePortletBuilder(object):
@@ -58,15 +58,19 @@ class PlonePortletBuilder(object):
         return manager, assignments
 
     def choose_name(self, assignments, portlet):
-        return INameChooser(assignments).chooseName(
-            name=portlet.__class__.__name__, object=portlet)
+        name = portlet.__class__.__name__
+        chooser = INameChooser(assignments)
+        return self.session.id_allocator.allocate(
+            assignments, name,
+            lambda: chooser.chooseName(name=name, object=portlet),
+            normalize_id_name,
+            is_taken=lambda candidate: candidate in assignments)
 
     def before_create(self):
         pass
 
     def after_create(self, manager, assignments, portlet):
-        if self.session.auto_commit:
-            transaction.commit()
+        self.session.maybe_commit()
 
 
 class StaticPortletBuilder(PlonePortletBuilder):
@@ -0,0 +1,35 @@
+from ftw.builder import HAS_RELATION
+from ftw.builder.indexing import DeferredQueue
+from ftw.builder.indexing import is_in_site
+
+if HAS_RELATION:
+    from z3c.relationfield.event import updateRelations
+
+
+class RelationQueue(DeferredQueue):
+    """The relation queue keeps created objects with relation values, so
+    that updating the relation catalog can be deferred until the fixture is
+    complete. The relation values are already set on the objects.
+    """
+
+    def __init__(self):
+        super(RelationQueue, self).__init__()
+        self._queue = []
+
+    def __len__(self):
+        return len(self._queue)
+
+    def add(self, obj):
+        """Queue updating the relation catalog for an object.
+        """
+        self._queue.append(obj)
+        self._hook_into_transaction()
+
+    def flush(self):
+        objects, self._queue = self._queue, []
+        for obj in objects:
+            if is_in_site(obj):
+                updateRelations(obj, None)
+
+    def clear(self):
+        self._queue = []
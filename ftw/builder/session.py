@@ -1,8 +1,183 @@
+from contextlib import contextmanager
+from ftw.builder.commit import LazyCommit
+from ftw.builder.indexing import ReindexCollector
+from ftw.builder.memberships import GroupMembershipQueue
+from ftw.builder.naming import IdAllocator
+from ftw.builder.naming import NameMemo
+from ftw.builder.once import OnceMemo
+from ftw.builder.relations import RelationQueue
+import transaction
+
 
 class BuilderSession(object):
 
     def __init__(self):
         self.auto_commit = False
+        self.commit_policy = None
+        self.indexing = ReindexCollector()
+        self.relations = RelationQueue()
+        self.group_memberships = GroupMembershipQueue()
+        self.field_plans = {}
+        self.default_values = {}
+        self.id_allocator = IdAllocator()
+        self.names = NameMemo()
+        self.workflow_chains = {}
+        self.workflow_role_mappings = {}
+        self.reuse_password_hashes = False
+        self.password_hashes = {}
+        self.created_once = OnceMemo()
+
+    @property
+    def defer_indexing(self):
+        return self.indexing.defer
+
+    @defer_indexing.setter
+    def defer_indexing(self, value):
+        self.indexing.defer = value
+
+    def reindex(self, obj, *idxs):
+        """Request a reindex of ``idxs`` for ``obj``.
+        The request is processed when the indexing is flushed.
+        """
+        self.indexing.reindex(obj, idxs)
+
+    def index(self, obj):
+        """Request indexing ``obj`` with all indexes.
+        The request is processed when the indexing is flushed.
+        """
+        self.indexing.index(obj)
+
+    def reindex_security(self, obj):
+        """Request reindexing the security of ``obj`` and its subtree.
+        Unless the indexing is deferred, this happens at the end of
+        ``create()``.
+        """
+        self.indexing.reindex_security(obj)
+
+    def flush_indexing(self, obj=None):
+        """Process the queued reindex requests.
+        """
+        self.indexing.flush(obj)
+
+    @property
+    def defer_relations(self):
+        return self.relations.defer
+
+    @defer_relations.setter
+    def defer_relations(self, value):
+        self.relations.defer = value
+
+    def flush_relations(self):
+        """Update the relation catalog for the objects with deferred
+        relations.
+        """
+        self.relations.flush()
+
+    @property
+    def defer_group_memberships(self):
+        return self.group_memberships.defer
+
+    @defer_group_memberships.setter
+    def defer_group_memberships(self, value):
+        self.group_memberships.defer = value
+
+    def add_group_members(self, groupid, principal_ids):
+        """Queue adding the principals to the group.
+        Unless the group memberships are deferred, they are written at the
+        end of ``create()``.
+        """
+        self.group_memberships.add(groupid, principal_ids)
+
+    def flush_group_memberships(self):
+        """Write the queued group memberships.
+        """
+        self.group_memberships.flush()
+
+    def flush(self):
+        """Process all deferred work of the session.
+        """
+        self.flush_group_memberships()
+        self.flush_relations()
+        self.flush_indexing()
+
+    @contextmanager
+    def deferred_indexing(self):
+        """Defer the reindexing of all objects created within the context
+        manager and reindex them in one pass when leaving it.
+        """
+        previous = self.defer_indexing
+        self.defer_indexing = True
+        try:
+            yield
+        finally:
+            self.defer_indexing = previous
+
+        if not previous:
+            self.flush_indexing()
+
+    @contextmanager
+    def batch(self):
+        """Defer reindexing, group memberships, relation catalog updates and
+        committing of all objects created within the context manager. When
+        leaving it, the objects are reindexed in one pass, the group
+        memberships are written group by group, the relation catalog is
+        updated and the objects are committed at most once, according to the
+        commit policy or ``auto_commit``.
+        """
+        policy = self.commit_policy
+        self.commit_policy = batch_policy = LazyCommit()
+        defer_group_memberships = self.defer_group_memberships
+        self.defer_group_memberships = True
+        defer_relations = self.defer_relations
+        self.defer_relations = True
+        try:
+            with self.deferred_indexing():
+                yield
+        finally:
+            self.commit_policy = policy
+            self.defer_group_memberships = defer_group_memberships
+            self.defer_relations = defer_relations
+
+        if not defer_group_memberships:
+            self.flush_group_memberships()
+        if not defer_relations:
+            self.flush_relations()
+
+        if not batch_policy.pending:
+            return
+
+        if policy is None:
+            if self.auto_commit:
+                transaction.commit()
+        else:
+            policy.pending += batch_policy.pending
+            if policy.should_commit():
+                self.commit()
+
+    def maybe_commit(self):
+        """Called by the builders after creating an object.
+        Commits the transaction when the commit policy asks for it.
+        Without a commit policy, every object is committed when
+        ``auto_commit`` is enabled.
+        """
+        if self.commit_policy is None:
+            if self.auto_commit:
+                transaction.commit()
+        elif self.commit_policy.created():
+            self.commit()
+
+    def commit(self):
+        transaction.commit()
+        if self.commit_policy is not None:
+            self.commit_policy.committed()
+
+    def commit_pending(self):
+        """Commit the objects which were created but not yet committed
+        because of the commit policy.
+        """
+        if self.commit_policy is not None and self.commit_policy.pending:
+            self.commit()
+
 
 factory = BuilderSession
 current_session = None
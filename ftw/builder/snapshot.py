@@ -0,0 +1,180 @@
+from Acquisition import aq_base
+from ftw.builder import builder_registry
+from ftw.builder import HAS_RELATION
+from ftw.builder.builder import Builder
+from ftw.builder.builder import create
+from ftw.builder.builder import CreatedObjects
+from ftw.builder.builder import PloneObjectBuilder
+from ftw.builder.naming import normalize_url_name
+from io import BytesIO
+from plone.uuid.interfaces import IAttributeUUID
+from plone.uuid.interfaces import IMutableUUID
+from plone.uuid.interfaces import IUUIDGenerator
+from zope.component import getUtility
+from zope.component import queryUtility
+from zope.container.interfaces import INameChooser
+import transaction
+
+if HAS_RELATION:
+    from zope.intid.interfaces import IIntIds
+
+
+class Snapshot(object):
+    """A ZEXP export of an object and its subtree, kept in memory or in a
+    file.
+    """
+
+    def __init__(self, data=None, path=None):
+        self.data = data
+        self.path = path
+
+    def open(self):
+        if self.path is None:
+            return BytesIO(self.data)
+        return open(self.path, 'rb')
+
+
+def take_snapshot(obj, path=None):
+    """Export ``obj`` and its subtree and return a ``Snapshot``.
+    Without a ``path`` the export is kept in memory.
+    """
+    # Objects created in the current transaction have no oid before
+    # a savepoint.
+    transaction.savepoint(optimistic=True)
+
+    if path is None:
+        data = BytesIO()
+        obj._p_jar.exportFile(obj._p_oid, data)
+        return Snapshot(data=data.getvalue())
+
+    with open(path, 'wb') as snapshot_file:
+        obj._p_jar.exportFile(obj._p_oid, snapshot_file)
+    return Snapshot(path=path)
+
+
+def iter_subtree(obj):
+    yield obj
+    object_values = getattr(aq_base(obj), 'objectValues', None)
+    if object_values is None:
+        return
+
+    for child in obj.objectValues():
+        for item in iter_subtree(child):
+            yield item
+
+
+class SnapshotBuilder(PloneObjectBuilder):
+    """The snapshot builder imports a copy of a snapshot taken with
+    ``take_snapshot``, which is much cheaper than building the subtree
+    again. No events are fired. The copies get new UUIDs and are registered
+    in the intid utility. Unless ``without_indexing`` is used, the subtree
+    is indexed in one pass when the indexing is flushed.
+    """
+
+    portal_type = None
+
+    def __init__(self, session):
+        super(SnapshotBuilder, self).__init__(session)
+        self.snapshot = None
+        self._id = None
+        self.indexing = True
+
+    def from_(self, snapshot):
+        self.snapshot = snapshot
+        return self
+
+    def with_id(self, id_):
+        self._id = id_
+        return self
+
+    def without_indexing(self):
+        self.indexing = False
+        return self
+
+    def create_object(self):
+        if self.snapshot is None:
+            raise ValueError('Cannot create snapshot: no snapshot defined.')
+
+        transaction.savepoint(optimistic=True)
+        snapshot_file = self.snapshot.open()
+        try:
+            imported = self.container._p_jar.importFile(snapshot_file)
+        finally:
+            snapshot_file.close()
+
+        name = self.choose_name(imported)
+        imported._setId(name)
+        self.container._setObject(name, imported, suppress_events=True)
+        obj = self.container._getOb(name)
+
+        self.set_properties(obj)
+        self.prepare_subtree(obj)
+        return obj
+
+    def choose_name(self, imported):
+        if self._id is not None:
+            return self._id
+
+        name = imported.getId()
+        chooser = INameChooser(self.container)
+        return self.session.id_allocator.allocate(
+            self.container, name,
+            lambda: chooser.chooseName(name, imported),
+            normalize_url_name)
+
+    def prepare_subtree(self, obj):
+        generate_uuid = getUtility(IUUIDGenerator)
+        intids = HAS_RELATION and queryUtility(IIntIds) or None
+
+        for item in iter_subtree(obj):
+            if getattr(aq_base(item), 'indexObject', None) is None:
+                continue
+
+            if IAttributeUUID.providedBy(item):
+                IMutableUUID(item).set(generate_uuid())
+            if intids is not None:
+                intids.register(item)
+            if self.indexing:
+                self.session.index(item)
+
+    def after_create(self, obj):
+        if not self.session.defer_indexing:
+            self.session.flush_indexing()
+        super(SnapshotBuilder, self).after_create(obj)
+
+
+def create_clones(builder, count, override=None):
+    """Creates ``count`` objects by creating one prototype object with
+    ``builder`` and importing ``count - 1`` copies of it.
+
+    The prototype is exported once and each copy is imported from this
+    export, which is much cheaper than running the builder for each object.
+    The optional ``override`` callable is called with each object and its
+    index and may change the object. All objects are indexed in one pass
+    after the overrides and committed at most once.
+    A lazy sequence of the objects, starting with the prototype, is returned.
+    Nothing is created when ``count`` is smaller than one.
+    """
+    objects = CreatedObjects()
+    if count < 1:
+        return objects
+
+    with builder.session.batch():
+        prototype = create(builder)
+        snapshot = take_snapshot(prototype)
+        objects.append(prototype)
+        if override is not None:
+            override(prototype, 0)
+            builder.session.index(prototype)
+
+        for index in range(1, count):
+            clone = create(Builder('snapshot').from_(snapshot)
+                           .within(builder.container))
+            if override is not None:
+                override(clone, index)
+            objects.append(clone)
+
+    return objects
+
+
+builder_registry.register('snapshot', SnapshotBuilder)
@@ -1,14 +1,23 @@
 from ftw.builder import session
+from ftw.builder.fixturecache import fixture_cache_key
+from ftw.builder.fixturecache import get_cache_paths
+from ftw.builder.fixturecache import open_snapshot
+from ftw.builder.fixturecache import prune_snapshots
+from ftw.builder.fixturecache import snapshot_storage
 from path import Path
 from plone.app.testing import applyProfile
 from plone.app.testing import FunctionalTesting
 from plone.app.testing import IntegrationTesting
+from plone.app.testing import login
+from plone.app.testing import logout
 from plone.app.testing import PLONE_FIXTURE
 from plone.app.testing import PloneSandboxLayer
+from plone.app.testing import SITE_OWNER_NAME
 from plone.testing import Layer
 from plone.testing import zca
 from Products.CMFPlone.utils import getFSVersionTuple
 from zope.configuration import xmlconfig
+import os
 import tempfile
 
 
@@ -44,6 +53,12 @@ def functional_session_factory():
     return sess
 
 
+def deferred_indexing_session_factory():
+    sess = session.BuilderSession()
+    sess.defer_indexing = True
+    return sess
+
+
 class TempDirectoryLayer(Layer):
 
     defaultBases = (BUILDER_LAYER, )
@@ -117,3 +132,87 @@ BUILDER_FUNCTIONAL_TESTING = FunctionalTesting(
     bases=(BUILDER_FIXTURE,
            set_builder_session_factory(functional_session_factory)),
     name="Builder:Functional")
+
+
+class FixtureLayer(PloneSandboxLayer):
+    """The fixture layer creates a fixture once when the layer is set up.
+
+    The fixture is a function, which is called with the portal and creates
+    objects with builders, or a compiled fixture plan (see
+    ``ftw.builder.fixture``). The objects are created in a session batch
+    while being logged in as site owner and are committed to the stacked
+    DemoStorage of the layer, so that all tests of the layer share them.
+
+    With ``cache`` enabled, the resulting ZODB is stored in a FileStorage
+    in the fixture cache directory (see ``ftw.builder.fixturecache``).
+    Later test runs mount this file read-only instead of running the
+    fixture, as long as the fixture, the registered builders and the
+    installed profile versions did not change. Outdated snapshots of the
+    layer are removed when a new one is stored. Only fixture plans,
+    functions and ``functools.partial`` objects of functions can be cached.
+    """
+
+    defaultBases = (PLONE_FIXTURE, BUILDER_LAYER)
+
+    def __init__(self, fixture, bases=None, name=None, module=None,
+                 cache=False):
+        super(FixtureLayer, self).__init__(
+            bases=bases, name=name, module=module)
+        self.fixture = fixture
+        self.cache = cache
+        self.cache_key = None
+        self.cache_paths = None
+        self.cache_hit = False
+        self.stacked_db = None
+
+    def setUp(self):
+        super(FixtureLayer, self).setUp()
+        if not self.cache:
+            return
+
+        path, blob_dir = self.cache_paths
+        if not self.cache_hit:
+            snapshot_storage(self['zodbDB'].storage, path, blob_dir)
+            prune_snapshots(self.__name__, self.cache_key)
+
+        self.stacked_db = self['zodbDB']
+        self['zodbDB'] = open_snapshot(path, blob_dir, self.__name__)
+
+    def tearDown(self):
+        if self.cache:
+            self['zodbDB'].close()
+            self['zodbDB'] = self.stacked_db
+        super(FixtureLayer, self).tearDown()
+
+    def setUpPloneSite(self, portal):
+        if self.cache:
+            self.cache_key = fixture_cache_key(self.fixture, portal)
+            self.cache_paths = get_cache_paths(self.__name__, self.cache_key)
+            self.cache_hit = os.path.exists(self.cache_paths[0])
+            if self.cache_hit:
+                return
+
+        previous_session = session.current_session
+        session.current_session = session.BuilderSession()
+        login(portal.getPhysicalRoot(), SITE_OWNER_NAME)
+        try:
+            with session.current_session.batch():
+                if hasattr(self.fixture, 'execute'):
+                    self.fixture.execute()
+                else:
+                    self.fixture(portal)
+        finally:
+            logout()
+            session.current_session = previous_session
+
+
+def fixture_layer(fixture, name, bases=None, cache=False):
+    """Returns a layer creating the ``fixture`` once at layer set up.
+    Pass the fixture layer of your package as ``bases``; it defaults to
+    the ``PLONE_FIXTURE`` and the ``BUILDER_LAYER``.
+    Use it as base of an ``IntegrationTesting`` or ``FunctionalTesting``
+    layer in order to isolate the tests: the ``FunctionalTesting`` layer
+    stacks another DemoStorage per test.
+    With ``cache=True`` the fixture is cached on disk between test runs.
+    """
+    return FixtureLayer(fixture, bases=bases, name=name, cache=cache)
@@ -1,6 +1,8 @@
 from ftw.builder import Builder
 from ftw.builder import create
+from ftw.builder import session
 from ftw.builder.tests import IntegrationTestCase
+from ftw.builder.tests.test_builder import obj2brain
 from Products.CMFPlone.utils import getFSVersionTuple
 from unittest import skipIf
 
@@ -32,3 +34,19 @@ class TestArchetypesBuilder(IntegrationTestCase):
 
         self.assertEqual('folder_contents', getattr(folder, 'layout', None))
         self.assertEqual(3, getattr(folder, 'foo', None))
+
+    def test_process_form_can_be_deferred(self):
+        folder = create(Builder('folder')
+                        .titled(u'Deferred')
+                        .without_process_form())
+        self.assertFalse(folder.checkCreationFlag())
+        self.assertEqual('Deferred', obj2brain(folder).Title)
+
+    def test_deferred_process_form_reindexes_once_per_batch(self):
+        with session.current_session.deferred_indexing():
+            folder = create(Builder('folder')
+                            .titled(u'Deferred')
+                            .without_process_form())
+            self.assertNotEqual('Deferred', obj2brain(folder).Title)
+
+        self.assertEqual('Deferred', obj2brain(folder).Title)
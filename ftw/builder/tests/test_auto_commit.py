@@ -1,6 +1,12 @@
+from ftw.builder import Builder
+from ftw.builder import create
 from ftw.builder import session
+from ftw.builder.commit import CommitAfterSeconds
+from ftw.builder.commit import CommitEveryNCreations
+from ftw.builder.commit import LazyCommit
 from ftw.builder.testing import BUILDER_FUNCTIONAL_TESTING
 from unittest import TestCase
+from ZODB.utils import z64
 
 
 class TestSessionAutoCommit(TestCase):
@@ -14,3 +20,40 @@ class TestSessionAutoCommit(TestCase):
         self.assertTrue(
             session.current_session.auto_commit,
             'Auto commit should be set to True')
+
+
+class TestCommitPolicies(TestCase):
+
+    def test_commit_every_n_creations(self):
+        policy = CommitEveryNCreations(3)
+        self.assertEqual([False, False, True],
+                         [policy.created() for _ in range(3)])
+        policy.committed()
+        self.assertEqual(0, policy.pending)
+        self.assertFalse(policy.created())
+
+    def test_commit_after_seconds(self):
+        policy = CommitAfterSeconds(60)
+        self.assertFalse(policy.created())
+        policy.last_commit -= 61
+        self.assertTrue(policy.created())
+
+    def test_lazy_commit_never_commits_while_creating(self):
+        policy = LazyCommit()
+        self.assertEqual([False, False],
+                         [policy.created() for _ in range(2)])
+        self.assertEqual(2, policy.pending)
+
+
+class TestSessionCommitPolicy(TestCase):
+
+    layer = BUILDER_FUNCTIONAL_TESTING
+
+    def test_pending_objects_are_committed_on_commit_pending(self):
+        session.current_session.commit_policy = LazyCommit()
+        folder = create(Builder('folder'))
+        self.assertEqual(z64, folder._p_serial)
+
+        session.current_session.commit_pending()
+        self.assertNotEqual(z64, folder._p_serial)
+        self.assertEqual(0, session.current_session.commit_policy.pending)
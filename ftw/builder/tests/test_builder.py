@@ -1,3 +1,4 @@
+from Acquisition import aq_base
 from Acquisition import aq_inner
 from Acquisition import aq_parent
 from datetime import datetime
@@ -5,10 +6,17 @@ from DateTime import DateTime
 from ftw.builder import Builder
 from ftw.builder import ticking_creator
 from ftw.builder import create
+from ftw.builder import create_many
+from ftw.builder import create_once
+from ftw.builder import iter_create
+from ftw.builder import session
+from ftw.builder.tests import FunctionalTestCase
 from ftw.builder.tests import IntegrationTestCase
 from ftw.testing import freeze
 from plone import api
 from Products.CMFCore.utils import getToolByName
+from zope.interface import Interface
+import transaction
 
 
 def obj2brain(obj):
@@ -95,6 +103,20 @@ class TestCreatingObjects(IntegrationTestCase):
         self.assertEqual(created, folder.created())
         self.assertEqual(created, obj2brain(folder).created)
 
+    def test_workflow_chains_and_role_mappings_are_cached(self):
+        self.set_workflow_chain('Folder', 'simple_publication_workflow')
+        create(Builder('folder').in_state('published'))
+
+        self.assertIn(('simple_publication_workflow',),
+                      session.current_session.workflow_chains.values())
+        self.assertIn(('simple_publication_workflow', 'published'),
+                      session.current_session.workflow_role_mappings)
+
+        published_folder = create(Builder('folder').in_state('published'))
+        self.assertEqual(
+            ['Anonymous'],
+            self.get_allowed_roles_and_users_for(published_folder))
+
     def set_workflow_chain(self, for_type, to_workflow):
         wftool = getToolByName(self.portal, 'portal_workflow')
         wftool.setChainForPortalTypes((for_type,),
@@ -129,3 +151,106 @@ class TestTickingCreator(IntegrationTestCase):
                                  create(Builder('folder')).created())
                 self.assertEqual(DateTime(2010, 1, 3),
                                  create(Builder('folder')).created())
+
+
+class TestCreateMany(IntegrationTestCase):
+
+    def test_creates_count_objects_from_template(self):
+        folders = create_many(Builder('folder').titled(u'Folder'), 3)
+        self.assertEqual(3, len(folders))
+        self.assertEqual([u'Folder'] * 3,
+                         [folder.Title() for folder in folders])
+
+    def test_vary_changes_each_builder(self):
+        folders = create_many(
+            Builder('folder'), 3,
+            vary=lambda builder, index: builder.titled(u'Folder %s' % index))
+        self.assertEqual(['folder-0', 'folder-1', 'folder-2'],
+                         [folder.getId() for folder in folders])
+
+    def test_template_builder_is_not_changed(self):
+        template = Builder('folder').titled(u'Folder')
+        create_many(template, 2,
+                    vary=lambda builder, index: builder.having(
+                        description=u'Nr. %s' % index))
+        self.assertEqual({'title': u'Folder'}, template.arguments)
+
+    def test_created_objects_are_indexed(self):
+        folders = create_many(Builder('folder').in_state('published'), 2)
+        self.assertEqual(['published', 'published'],
+                         [obj2brain(folder).review_state
+                          for folder in folders])
+
+    def test_raw_mode_is_refused_for_builders_without_support(self):
+        with self.assertRaises(ValueError):
+            create_many(Builder('static portlet'), 2, raw=True)
+
+
+class TestIterCreate(IntegrationTestCase):
+
+    def test_yields_created_objects(self):
+        folders = iter_create(
+            lambda index: Builder('folder').titled(u'Folder %s' % index), 3,
+            savepoint_every=2, gc_every=2, minimize_every=3)
+        self.assertEqual(['folder-0', 'folder-1', 'folder-2'],
+                         [folder.getId() for folder in folders])
+        self.assertEqual(['folder-0', 'folder-1', 'folder-2'],
+                         sorted(self.portal.contentIds()))
+
+    def test_objects_are_created_lazily(self):
+        folders = iter_create(lambda index: Builder('folder'), 2)
+        self.assertNotIn('folder', self.portal.objectIds())
+        next(folders)
+        self.assertIn('folder', self.portal.objectIds())
+
+
+class IFoo(Interface):
+    pass
+
+
+class TestCreateOnce(IntegrationTestCase):
+
+    def test_returns_object_of_equal_builder(self):
+        folder = create_once(Builder('folder').titled(u'Shared'))
+        self.assertEqual(folder,
+                         create_once(Builder('folder').titled(u'Shared')))
+        self.assertEqual(['shared'], self.portal.contentIds())
+
+    def test_different_builders_create_different_objects(self):
+        parent = create(Builder('folder').titled(u'Parent'))
+        first = create_once(Builder('folder').titled(u'Child'))
+        second = create_once(Builder('folder').titled(u'Child')
+                             .within(parent))
+        third = create_once(Builder('folder').titled(u'Child')
+                            .providing(IFoo))
+        self.assertEqual(3, len(set(map(aq_base, (first, second, third)))))
+
+    def test_users_are_created_once(self):
+        user = create_once(Builder('user').with_userid('editor'))
+        self.assertEqual(
+            user.getId(),
+            create_once(Builder('user').with_userid('editor')).getId())
+
+    def test_deleted_objects_are_created_again(self):
+        folder = create_once(Builder('folder').titled(u'Shared'))
+        self.portal.manage_delObjects([folder.getId()])
+        create_once(Builder('folder').titled(u'Shared'))
+        self.assertEqual(['shared'], self.portal.contentIds())
+
+    def test_objects_of_aborted_transactions_are_created_again(self):
+        create_once(Builder('folder').titled(u'Shared'))
+        transaction.abort()
+        self.assertEqual([], self.portal.contentIds())
+
+        create_once(Builder('folder').titled(u'Shared'))
+        self.assertEqual(['shared'], self.portal.contentIds())
+
+
+class TestCreateOnceCommitting(FunctionalTestCase):
+
+    def test_objects_of_committed_transactions_are_kept(self):
+        folder = create_once(Builder('folder').titled(u'Shared'))
+        transaction.commit()
+        self.assertEqual(folder,
+                         create_once(Builder('folder').titled(u'Shared')))
+        self.assertEqual(['shared'], self.portal.contentIds())
@@ -3,8 +3,11 @@ from datetime import datetime
 from DateTime import DateTime
 from ftw.builder import Builder
 from ftw.builder import create
+from ftw.builder import create_many
 from ftw.builder import registry
+from ftw.builder import session
 from ftw.builder.dexterity import DexterityBuilder
+from ftw.builder.dexterity import dynamic_marker
 from ftw.builder.testing import BUILDER_FUNCTIONAL_TESTING
 from ftw.builder.tests.test_builder import obj2brain
 from plone.app.testing import login
@@ -262,6 +265,112 @@ class TestDexterityBuilder(DexterityBaseTestCase):
         self.assertEqual(u"default value", IAnnotationStored(book).some_field)
 
 
+class TestDeferredRelations(DexterityBaseTestCase):
+
+    def test_relation_catalog_is_updated_on_flush(self):
+        session.current_session.auto_commit = False
+        session.current_session.defer_relations = True
+        related = create(Builder('book'))
+        book = create(Builder('book').having(relation_list=[related],
+                                             relation_choice=related))
+        self.assertEqual([related],
+                         [value.to_object for value in book.relation_list])
+        self.assertEqual(related, book.relation_choice.to_object)
+        self.assertIsNone(book.relation_choice.from_object)
+
+        session.current_session.flush_relations()
+        self.assertEqual(book, book.relation_choice.from_object)
+
+    def test_relations_are_updated_when_leaving_a_batch(self):
+        with session.current_session.batch():
+            related = create(Builder('book'))
+            book = create(Builder('book').having(relation_choice=related))
+            self.assertEqual(related, book.relation_choice.to_object)
+            self.assertIsNone(book.relation_choice.from_object)
+
+        self.assertEqual(book, book.relation_choice.from_object)
+
+    def test_relations_are_updated_before_committing(self):
+        session.current_session.defer_relations = True
+        related = create(Builder('book'))
+        book = create(Builder('book').having(relation_choice=related))
+        self.assertEqual(book, book.relation_choice.from_object)
+        self.assertEqual(0, len(session.current_session.relations))
+
+
+class TestFieldPlan(DexterityBaseTestCase):
+
+    def test_field_plan_lists_schema_and_behavior_fields(self):
+        names = [planned.name for planned in Builder('book').field_plan]
+        self.assertIn('chapters', names)
+        self.assertIn('effective', names)
+        self.assertIn('some_field', names)
+
+    def test_field_plan_knows_relation_fields(self):
+        relations = dict((planned.name, planned.relation)
+                         for planned in Builder('book').field_plan)
+        self.assertEqual('choice', relations['relation_choice'])
+        self.assertEqual('list', relations['relation_list'])
+        self.assertEqual(None, relations['chapters'])
+
+    def test_field_plan_is_cached(self):
+        self.assertIs(Builder('book').field_plan, Builder('book').field_plan)
+
+    def test_field_plan_is_recomputed_when_behaviors_change(self):
+        plan = Builder('book').field_plan
+        self.fti.behaviors = (
+            'plone.app.dexterity.behaviors.metadata.IOwnership',)
+        names = [planned.name for planned in Builder('book').field_plan]
+        self.assertIsNot(plan, Builder('book').field_plan)
+        self.assertNotIn('effective', names)
+        self.assertIn('creators', names)
+
+    def test_setter_plan_groups_fields_by_interface(self):
+        interfaces = [interface for interface, _
+                      in Builder('book').setter_plan]
+        self.assertEqual(len(set(interfaces)), len(interfaces))
+        self.assertIn(IAnnotationStored, interfaces)
+
+    def test_overridden_set_field_values_hook_is_called(self):
+        class UpperCaseTitleBookBuilder(BookBuilder):
+            def set_field_values(self, obj):
+                super(UpperCaseTitleBookBuilder, self).set_field_values(obj)
+                obj.title = obj.title.upper()
+
+        registry.builder_registry.register('book', UpperCaseTitleBookBuilder,
+                                           force=True)
+        book = create(Builder('book').titled(u'Book'))
+        self.assertEqual(u'BOOK', book.title)
+        self.assertEqual((), book.chapters)
+
+
+class TestDefaultValueMemo(DexterityBaseTestCase):
+
+    def get_memoized_default(self, name):
+        for key, value in session.current_session.default_values.items():
+            if key[0] == 'Book' and key[2] == name:
+                return value
+        return None
+
+    def test_static_defaults_are_memoized(self):
+        create(Builder('book'))
+        self.assertEqual(u'test_user_1_', self.get_memoized_default('author'))
+
+    def test_defaults_from_factories_are_not_memoized(self):
+        create(Builder('book'))
+        self.assertIs(dynamic_marker, self.get_memoized_default('topic'))
+        self.assertIs(dynamic_marker,
+                      self.get_memoized_default('container_title'))
+
+    def test_context_aware_defaults_are_evaluated_per_container(self):
+        folder = create(Builder('folder').titled(u'The Folder'))
+        self.assertEqual(u'Plone site',
+                         create(Builder('book')).container_title)
+        self.assertEqual(u'The Folder',
+                         create(Builder('book').within(folder))
+                         .container_title)
+
+
 @adapter(IObjectCreatedEvent)
 def track_created_events(event):
     getSite().fired_events.append(event)
@@ -285,3 +394,34 @@ class TestEventNotifying(DexterityBaseTestCase):
         created_event, added_event = self.portal.fired_events
         self.assertTrue(IObjectCreatedEvent.providedBy(created_event))
         self.assertTrue(IObjectAddedEvent.providedBy(added_event))
+
+
+class TestRawMode(DexterityBaseTestCase):
+
+    def setUp(self):
+        super(TestRawMode, self).setUp()
+        self.portal.fired_events = []
+        self.portal.getSiteManager().registerHandler(track_created_events)
+        self.portal.getSiteManager().registerHandler(track_added_events)
+
+    def test_raw_mode_does_not_fire_events(self):
+        book = create(Builder('book').titled(u'Raw').raw())
+        self.assertEqual([], self.portal.fired_events)
+        self.assertEqual(book, self.portal.get(book.getId()))
+
+    def test_raw_objects_are_cataloged(self):
+        book = create(Builder('book').titled(u'Raw').raw())
+        self.assertEqual(u'Raw', obj2brain(book).Title)
+
+    def test_listed_subscribers_are_called(self):
+        calls = []
+        book = create(Builder('book').raw(
+            lambda obj, event: calls.append((obj, event))))
+        self.assertEqual(1, len(calls))
+        self.assertEqual(book, calls[0][0])
+        self.assertTrue(IObjectAddedEvent.providedBy(calls[0][1]))
+
+    def test_create_many_in_raw_mode(self):
+        books = create_many(Builder('book'), 3, raw=True)
+        self.assertEqual([], self.portal.fired_events)
+        self.assertEqual(3, len([obj2brain(book) for book in books]))
@@ -0,0 +1,120 @@
+from ftw.builder.fixture import compile_fixture
+from ftw.builder.fixture import load_fixture
+from ftw.builder.registry import builder_registry
+from ftw.builder.tests import IntegrationTestCase
+from ftw.builder.tests.test_builder import obj2brain
+from Products.CMFCore.utils import getToolByName
+import json
+import os
+import shutil
+import tempfile
+
+
+FIXTURE = [
+    {'builder': 'folder',
+     'name': 'intranet',
+     'titled': u'Intranet',
+     'children': [
+         {'builder': 'document',
+          'name': 'welcome',
+          'having': {'title': u'Welcome'}}]},
+    {'builder': 'user',
+     'name': 'hugo',
+     'named': ['Hugo', 'Boss'],
+     'calls': [
+         {'with_roles': {'args': ['Editor'],
+                         'kwargs': {'on': {'$ref': 'intranet'}}}}]}]
+
+
+class ValuesBuilder(object):
+
+    def __init__(self, session):
+        self.session = session
+        self.values = None
+
+    def with_values(self, values):
+        self.values = values
+        return self
+
+    def create(self):
+        return self.values
+
+
+class TestFixture(IntegrationTestCase):
+
+    def setUp(self):
+        super(TestFixture, self).setUp()
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+        super(TestFixture, self).tearDown()
+
+    def write_fixture(self, data):
+        path = os.path.join(self.tempdir, 'fixture.json')
+        with open(path, 'w') as fixture_file:
+            json.dump(data, fixture_file)
+        return path
+
+    def test_executing_fixture_creates_objects(self):
+        objects = load_fixture(self.write_fixture(FIXTURE)).execute()
+
+        self.assertEqual(['intranet', 'welcome', 'hugo'], list(objects))
+        self.assertEqual('Welcome', obj2brain(objects['welcome']).Title)
+        self.assertEqual(objects['intranet'], objects['welcome'].aq_parent)
+        self.assertEqual('hugo.boss', objects['hugo'].getId())
+        self.assertIn('Editor',
+                      objects['hugo'].getRolesInContext(objects['intranet']))
+
+    def test_compiled_plans_are_cached_by_file_content(self):
+        path = self.write_fixture(FIXTURE)
+        self.assertIs(load_fixture(path), load_fixture(path))
+        self.assertEqual(3, len(load_fixture(path)))
+
+    def test_top_level_objects_are_created_within_container(self):
+        container = load_fixture(self.write_fixture(
+            [{'builder': 'folder', 'name': 'container'}])).execute()
+        objects = compile_fixture(
+            [{'builder': 'folder', 'name': 'child'}]).execute(
+                within=container['container'])
+        self.assertEqual(container['container'], objects['child'].aq_parent)
+
+    def test_unknown_builder_is_rejected(self):
+        with self.assertRaises(ValueError) as cm:
+            compile_fixture([{'builder': 'unknown'}])
+        self.assertEqual('Unknown builder "unknown"', str(cm.exception))
+
+    def test_unknown_method_is_rejected(self):
+        with self.assertRaises(ValueError) as cm:
+            compile_fixture([{'builder': 'user', 'titled': 'Foo'}])
+        self.assertEqual('Builder "UserBuilder" has no method "titled"',
+                         str(cm.exception))
+
+    def test_references_must_point_to_previous_nodes(self):
+        with self.assertRaises(ValueError) as cm:
+            compile_fixture([
+                {'builder': 'user',
+                 'calls': [{'with_roles': {'args': ['Editor'],
+                                           'kwargs': {'on': {'$ref': 'x'}}}}]},
+                {'builder': 'folder', 'name': 'x'}])
+        self.assertEqual('Fixture reference to unknown or later node "x"',
+                         str(cm.exception))
+
+    def test_review_state_is_set(self):
+        wftool = getToolByName(self.portal, 'portal_workflow')
+        wftool.setChainForPortalTypes(['Folder'],
+                                      'simple_publication_workflow')
+        objects = compile_fixture(
+            [{'builder': 'folder', 'name': 'folder',
+              'in_state': 'published'}]).execute()
+        self.assertEqual('published',
+                         obj2brain(objects['folder']).review_state)
+
+    def test_executions_do_not_share_arguments(self):
+        with builder_registry.temporary_builder_config():
+            builder_registry.register('values', ValuesBuilder)
+            plan = compile_fixture([{'builder': 'values',
+                                     'name': 'values',
+                                     'with_values': [[u'a']]}])
+            plan.execute()['values'].append(u'b')
+            self.assertEqual([u'a'], plan.execute()['values'])
@@ -0,0 +1,48 @@
+from ftw.builder import Builder
+from ftw.builder import create
+from ftw.builder.testing import BUILDER_FIXTURE
+from ftw.builder.testing import fixture_layer
+from plone.app.testing import FunctionalTesting
+from plone.app.testing import login
+from plone.app.testing import setRoles
+from plone.app.testing import TEST_USER_ID
+from plone.app.testing import TEST_USER_NAME
+from unittest import TestCase
+
+
+def create_fixture(portal):
+    create(Builder('folder').titled(u'Shared'))
+
+
+SHARED_FIXTURE = fixture_layer(create_fixture,
+                               name='ftw.builder.tests:SharedFixture',
+                               bases=(BUILDER_FIXTURE, ))
+
+SHARED_FIXTURE_TESTING = FunctionalTesting(
+    bases=(SHARED_FIXTURE, ),
+    name='ftw.builder.tests:SharedFixture:Functional')
+
+
+class TestFixtureLayer(TestCase):
+
+    layer = SHARED_FIXTURE_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+        login(self.portal, TEST_USER_NAME)
+
+    def test_fixture_is_created_once_for_all_tests(self):
+        self.assertIn('shared', self.portal.objectIds())
+
+    def test_changes_are_isolated_per_test_1(self):
+        self.assert_isolated()
+
+    def test_changes_are_isolated_per_test_2(self):
+        self.assert_isolated()
+
+    def assert_isolated(self):
+        shared = self.portal.get('shared')
+        self.assertEqual([], list(shared.objectIds()))
+        create(Builder('folder').within(shared))
+        self.assertEqual(1, len(shared.objectIds()))
@@ -0,0 +1,131 @@
+from ftw.builder.fixture import compile_fixture
+from ftw.builder.fixturecache import get_cache_paths
+from ftw.builder.fixturecache import get_source
+from ftw.builder.fixturecache import open_snapshot
+from ftw.builder.fixturecache import prune_snapshots
+from ftw.builder.fixturecache import snapshot_storage
+from persistent.mapping import PersistentMapping
+from unittest import TestCase
+from ZODB.DB import DB
+from ZODB.MappingStorage import MappingStorage
+import functools
+import os
+import shutil
+import tempfile
+import transaction
+
+# Larger than the maximum process id of Linux.
+DEAD_PID = 2 ** 22 + 1
+
+
+class TestSnapshotStorage(TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tempdir, 'fixture.fs')
+        self.blob_dir = os.path.join(self.tempdir, 'fixture.blobs')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_snapshot_contains_reachable_objects(self):
+        db = DB(MappingStorage())
+        connection = db.open()
+        connection.root()['folder'] = PersistentMapping(
+            {'child': PersistentMapping({'title': 'Child'})})
+        transaction.commit()
+        connection.close()
+
+        snapshot_storage(db.storage, self.path, self.blob_dir)
+        db.close()
+        self.assertEqual(['fixture.blobs', 'fixture.fs', 'fixture.fs.index'],
+                         sorted(os.listdir(self.tempdir)))
+
+        snapshot = open_snapshot(self.path, self.blob_dir, 'test')
+        connection = snapshot.open()
+        self.assertEqual(
+            'Child', connection.root()['folder']['child']['title'])
+
+        connection.root()['other'] = PersistentMapping()
+        transaction.commit()
+        connection.close()
+        snapshot.close()
+
+        snapshot = open_snapshot(self.path, self.blob_dir, 'test')
+        connection = snapshot.open()
+        self.assertNotIn('other', connection.root())
+        connection.close()
+        snapshot.close()
+
+    def test_cache_paths_are_in_the_configured_directory(self):
+        os.environ['FTW_BUILDER_FIXTURE_CACHE'] = self.tempdir
+        try:
+            self.assertEqual(
+                (os.path.join(self.tempdir, 'my.package-Shared-abc.fs'),
+                 os.path.join(self.tempdir, 'my.package-Shared-abc.blobs')),
+                get_cache_paths('my.package:Shared', 'abc'))
+        finally:
+            del os.environ['FTW_BUILDER_FIXTURE_CACHE']
+
+    def test_outdated_snapshots_of_the_layer_are_pruned(self):
+        old_key, new_key, other_key = 'a' * 40, 'b' * 40, 'c' * 40
+        filenames = ['my.package-Shared-%s.fs' % old_key,
+                     'my.package-Shared-%s.fs.index' % old_key,
+                     'my.package-Shared-%s.fs' % new_key,
+                     'my.package-Shared-%s.fs.index' % new_key,
+                     'my.package-Shared-Other-%s.fs' % other_key,
+                     # Leftovers of a crashed test run.
+                     'my.package-Shared-%s.fs.%d.tmp' % (new_key, DEAD_PID),
+                     'my.package-Shared-%s.fs.%d.tmp.index' % (new_key,
+                                                              DEAD_PID)]
+        for filename in filenames:
+            open(os.path.join(self.tempdir, filename), 'w').close()
+        os.mkdir(os.path.join(self.tempdir,
+                              'my.package-Shared-%s.blobs' % old_key))
+        os.mkdir(os.path.join(self.tempdir, 'my.package-Shared-%s.blobs.%d.tmp'
+                              % (new_key, DEAD_PID)))
+
+        os.environ['FTW_BUILDER_FIXTURE_CACHE'] = self.tempdir
+        try:
+            prune_snapshots('my.package:Shared', new_key)
+        finally:
+            del os.environ['FTW_BUILDER_FIXTURE_CACHE']
+
+        self.assertEqual(
+            ['my.package-Shared-%s.fs' % new_key,
+             'my.package-Shared-%s.fs.index' % new_key,
+             'my.package-Shared-Other-%s.fs' % other_key],
+            sorted(os.listdir(self.tempdir)))
+
+
+def create_folders(portal, count):
+    pass
+
+
+class TestGetSource(TestCase):
+
+    def test_source_of_functions_and_partials(self):
+        self.assertIn('def create_folders', get_source(create_folders))
+        self.assertNotEqual(
+            get_source(functools.partial(create_folders, count=1)),
+            get_source(functools.partial(create_folders, count=2)))
+
+    def test_steps_of_plans_without_digest_are_used(self):
+        plan = compile_fixture([{'builder': 'user',
+                                 'named': ['Hans', 'Peter']}])
+        self.assertEqual(
+            get_source(plan),
+            get_source(compile_fixture([{'builder': 'user',
+                                         'named': ['Hans', 'Peter']}])))
+        self.assertNotEqual(
+            get_source(plan),
+            get_source(compile_fixture([{'builder': 'user',
+                                         'named': ['Hans', 'Muster']}])))
+
+    def test_fixtures_without_source_cannot_be_cached(self):
+        class Fixture(object):
+            def __call__(self, portal):
+                pass
+
+        with self.assertRaises(ValueError):
+            get_source(Fixture())
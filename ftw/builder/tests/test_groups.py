@@ -1,5 +1,6 @@
 from ftw.builder import Builder
 from ftw.builder import create
+from ftw.builder import session
 from ftw.builder.tests import IntegrationTestCase
 from Products.CMFCore.utils import getToolByName
 
@@ -63,3 +64,27 @@ class TestUserBuilder(IntegrationTestCase):
         rid = catalog(path='/'.join(folder.getPhysicalPath()))[0].getRID()
         self.assertIn('user:{0}'.format(group.getId()),
                       catalog.getIndexDataForRID(rid)['allowedRolesAndUsers'])
+
+    def test_deferred_memberships_are_written_on_flush(self):
+        session.current_session.defer_group_memberships = True
+        users = [create(Builder('user').named('User', str(index)))
+                 for index in range(3)]
+        create(Builder('group').with_groupid('staff').with_members(*users))
+        create(Builder('user').named('Hugo', 'Boss').in_groups('staff'))
+
+        portal_groups = getToolByName(self.portal, 'portal_groups')
+        self.assertEqual([], portal_groups.getGroupMembers('staff'))
+
+        session.current_session.flush_group_memberships()
+        self.assertEqual(['hugo.boss', 'user.0', 'user.1', 'user.2'],
+                         sorted(portal_groups.getGroupMembers('staff')))
+
+    def test_memberships_are_written_when_leaving_a_batch(self):
+        create(Builder('group').with_groupid('staff'))
+        portal_groups = getToolByName(self.portal, 'portal_groups')
+
+        with session.current_session.batch():
+            create(Builder('user').named('Hugo', 'Boss').in_groups('staff'))
+            self.assertEqual([], portal_groups.getGroupMembers('staff'))
+
+        self.assertEqual(['hugo.boss'], portal_groups.getGroupMembers('staff'))
@@ -0,0 +1,176 @@
+from DateTime import DateTime
+from ftw.builder import Builder
+from ftw.builder import create
+from ftw.builder import session
+from ftw.builder import indexing
+from ftw.builder.indexing import ReindexCollector
+from ftw.builder.tests import IntegrationTestCase
+from ftw.builder.tests.test_builder import obj2brain
+from Products.CMFCore.utils import getToolByName
+from unittest import TestCase
+from zope.component import getGlobalSiteManager
+from zope.component.hooks import setSite
+from zope.interface import Interface
+import transaction
+
+
+class IFoo(Interface):
+    pass
+
+
+class DummySite(object):
+
+    def __init__(self):
+        self.objects = {}
+
+    def getSiteManager(self):
+        return getGlobalSiteManager()
+
+    def unrestrictedTraverse(self, path, default=None):
+        return self.objects.get(path, default)
+
+
+class DummyObject(object):
+
+    def __init__(self, site, path):
+        self.path = path
+        self.reindexed = []
+        site.objects['/'.join(path)] = self
+
+    def getPhysicalPath(self):
+        return self.path
+
+    def reindexObject(self, idxs=[]):
+        self.reindexed.append(idxs)
+
+    def reindexObjectSecurity(self):
+        self.reindexed.append('security')
+
+
+class TestReindexCollector(TestCase):
+
+    def setUp(self):
+        self.site = DummySite()
+        setSite(self.site)
+
+    def tearDown(self):
+        setSite(None)
+        transaction.abort()
+
+    def test_merges_index_names_per_object(self):
+        obj = DummyObject(self.site, ('', 'plone', 'obj'))
+        collector = ReindexCollector()
+        collector.reindex(obj, ['object_provides'])
+        collector.reindex(obj, ['review_state'])
+        collector.reindex(obj, ['modified', 'review_state'])
+        collector.flush(obj)
+        self.assertEqual([['modified', 'object_provides', 'review_state']],
+                         obj.reindexed)
+
+    def test_flushing_an_object_is_skipped_when_deferring(self):
+        obj = DummyObject(self.site, ('', 'plone', 'obj'))
+        collector = ReindexCollector()
+        collector.defer = True
+        collector.reindex(obj, ['modified'])
+        collector.flush(obj)
+        self.assertEqual([], obj.reindexed)
+
+        collector.flush()
+        self.assertEqual([['modified']], obj.reindexed)
+        self.assertEqual(0, len(collector))
+
+    def test_indexing_queue_is_processed_after_flushing_all(self):
+        processed = []
+        original = indexing.processQueue
+        indexing.processQueue = lambda: processed.append(True)
+        try:
+            collector = ReindexCollector()
+            collector.reindex(DummyObject(self.site, ('', 'plone', 'obj')),
+                              ['modified'])
+            collector.flush()
+        finally:
+            indexing.processQueue = original
+
+        self.assertEqual([True], processed)
+
+    def test_security_requests_of_aborted_transactions_are_dropped(self):
+        obj = DummyObject(self.site, ('', 'plone', 'obj'))
+        collector = ReindexCollector()
+        collector.defer = True
+        collector.reindex_security(obj)
+        transaction.abort()
+        self.assertEqual(0, len(collector))
+
+        collector.reindex_security(obj)
+        transaction.commit()
+        self.assertEqual(['security'], obj.reindexed)
+
+
+class TestSessionIndexing(IntegrationTestCase):
+
+    def test_all_requested_indexes_are_up_to_date_after_create(self):
+        modified = DateTime(2013, 1, 1)
+        folder = create(Builder('folder')
+                        .providing(IFoo)
+                        .with_modification_date(modified))
+
+        self.assertEqual(modified, obj2brain(folder).modified)
+        catalog = getToolByName(self.portal, 'portal_catalog')
+        self.assertEqual(
+            [folder.getPhysicalPath()],
+            [brain.getObject().getPhysicalPath()
+             for brain in catalog(object_provides=IFoo.__identifier__)])
+
+    def test_deferred_reindexing_is_processed_on_flush(self):
+        session.current_session.defer_indexing = True
+        modified = DateTime(2013, 1, 1)
+        folder = create(Builder('folder').with_modification_date(modified))
+        self.assertNotEqual(modified, obj2brain(folder).modified)
+
+        session.current_session.flush_indexing()
+        self.assertEqual(modified, obj2brain(folder).modified)
+
+    def test_deferred_indexing_context_manager_flushes_on_exit(self):
+        modified = DateTime(2013, 1, 1)
+        with session.current_session.deferred_indexing():
+            folder = create(Builder('folder')
+                            .with_modification_date(modified))
+            self.assertNotEqual(modified, obj2brain(folder).modified)
+
+        self.assertEqual(modified, obj2brain(folder).modified)
+        self.assertFalse(session.current_session.defer_indexing)
+
+    def test_deleted_objects_are_skipped_when_flushing(self):
+        with session.current_session.deferred_indexing():
+            folder = create(Builder('folder')
+                            .with_modification_date(DateTime(2013, 1, 1)))
+            self.portal.manage_delObjects([folder.getId()])
+
+        catalog = getToolByName(self.portal, 'portal_catalog')
+        self.assertEqual(
+            0, len(catalog(path='/'.join(folder.getPhysicalPath()))))
+
+
+class TestDeferredSecurityReindexing(IntegrationTestCase):
+
+    def get_allowed_roles_and_users(self, obj):
+        catalog = getToolByName(self.portal, 'portal_catalog')
+        rid = catalog.getrid('/'.join(obj.getPhysicalPath()))
+        return catalog.getIndexDataForRID(rid)['allowedRolesAndUsers']
+
+    def test_local_roles_of_many_users_are_reindexed_on_flush(self):
+        parent = create(Builder('folder'))
+        child = create(Builder('folder').within(parent))
+
+        with session.current_session.deferred_indexing():
+            create(Builder('user').named('Hugo', 'Boss')
+                   .with_roles('Reader', on=parent))
+            create(Builder('user').named('John', 'Doe')
+                   .with_roles('Reader', on=child))
+            self.assertNotIn('user:john.doe',
+                             self.get_allowed_roles_and_users(child))
+
+        self.assertIn('user:hugo.boss',
+                      self.get_allowed_roles_and_users(child))
+        self.assertIn('user:john.doe',
+                      self.get_allowed_roles_and_users(child))
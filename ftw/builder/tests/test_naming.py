@@ -0,0 +1,118 @@
+from ftw.builder import Builder
+from ftw.builder import create
+from ftw.builder.naming import IdAllocator
+from ftw.builder.naming import NameMemo
+from ftw.builder.tests import IntegrationTestCase
+from Products.CMFPlone.utils import getFSVersionTuple
+from unittest import skipIf
+from unittest import TestCase
+
+
+class TestNameMemo(TestCase):
+
+    def test_computes_each_name_only_once_per_key(self):
+        calls = []
+
+        def upper(name):
+            calls.append(name)
+            return name.upper()
+
+        memo = NameMemo()
+        self.assertEqual('HUGO', memo.memoize('upper', 'hugo', upper))
+        self.assertEqual('HUGO', memo.memoize('upper', 'hugo', upper))
+        self.assertEqual('BOSS', memo.memoize('upper', 'boss', upper))
+        self.assertEqual('HUGO', memo.memoize('other', 'hugo', upper))
+        self.assertEqual(['hugo', 'boss', 'hugo'], calls)
+
+
+class TestIdAllocator(TestCase):
+
+    def setUp(self):
+        self.container = {}
+        self.chooser_calls = []
+
+    def allocate(self, allocator, name):
+        def choose():
+            self.chooser_calls.append(name)
+            candidate, index = name.lower(), 0
+            while candidate in self.container:
+                index += 1
+                candidate = '%s-%d' % (name.lower(), index)
+            return candidate
+
+        new_id = allocator.allocate(
+            self.container, name, choose, lambda value: value.lower(),
+            is_taken=lambda candidate: candidate in self.container)
+        self.container[new_id] = object()
+        return new_id
+
+    def test_uses_name_chooser_only_for_first_object(self):
+        allocator = IdAllocator()
+        self.assertEqual(['foo', 'foo-1', 'foo-2'],
+                         [self.allocate(allocator, 'Foo') for _ in range(3)])
+        self.assertEqual(['Foo'], self.chooser_calls)
+
+    def test_continues_after_id_chosen_by_name_chooser(self):
+        self.container.update({'foo': None, 'foo-1': None})
+        allocator = IdAllocator()
+        self.assertEqual(['foo-2', 'foo-3'],
+                         [self.allocate(allocator, 'Foo') for _ in range(2)])
+
+    def test_skips_ids_taken_in_the_meantime(self):
+        allocator = IdAllocator()
+        self.allocate(allocator, 'Foo')
+        self.container['foo-1'] = None
+        self.assertEqual('foo-2', self.allocate(allocator, 'Foo'))
+
+    def test_falls_back_to_name_chooser_for_unknown_ids(self):
+        allocator = IdAllocator()
+        allocator.allocate(self.container, 'Foo', lambda: 'other',
+                           lambda value: value.lower())
+        self.assertEqual(
+            'chosen', allocator.allocate(self.container, 'Foo',
+                                         lambda: 'chosen',
+                                         lambda value: value.lower()))
+
+    def test_counter_is_put_before_the_file_extension(self):
+        allocator = IdAllocator()
+        self.container['test.doc'] = allocator.allocate(
+            self.container, 'test.doc', lambda: 'test.doc',
+            lambda value: value)
+        self.assertEqual(
+            'test-1.doc', allocator.allocate(
+                self.container, 'test.doc', lambda: 'test.doc',
+                lambda value: value,
+                is_taken=lambda candidate: candidate in self.container))
+
+    def test_continues_after_numbered_id_with_file_extension(self):
+        allocator = IdAllocator()
+        allocator.allocate(self.container, 'test.doc', lambda: 'test-3.doc',
+                           lambda value: value)
+        self.assertEqual(
+            'test-4.doc', allocator.allocate(self.container, 'test.doc',
+                                             lambda: 'chosen',
+                                             lambda value: value))
+
+
+class TestIdAllocationOfBuilders(IntegrationTestCase):
+
+    def test_objects_with_the_same_title_get_consecutive_ids(self):
+        self.assertEqual(
+            ['the-folder', 'the-folder-1', 'the-folder-2'],
+            [create(Builder('folder').titled(u'The Folder')).getId()
+             for _ in range(3)])
+
+    def test_existing_ids_are_not_reused(self):
+        create(Builder('folder').titled(u'The Folder'))
+        create(Builder('folder').titled(u'The Folder 1'))
+        self.assertEqual(
+            'the-folder-2',
+            create(Builder('folder').titled(u'The Folder')).getId())
+
+    @skipIf(getFSVersionTuple() < (5,),
+            'Dexterity files are only registered on Plone 5 and newer.')
+    def test_files_with_the_same_filename_get_ids_like_the_name_chooser(self):
+        self.assertEqual(
+            ['test.doc', 'test-1.doc', 'test-2.doc'],
+            [create(Builder('file').attach_file_containing(b'Data')).getId()
+             for _ in range(3)])
@@ -0,0 +1,90 @@
+from ftw.builder import Builder
+from ftw.builder import create
+from ftw.builder import create_clones
+from ftw.builder.snapshot import take_snapshot
+from ftw.builder.tests import IntegrationTestCase
+from plone.uuid.interfaces import IUUID
+from Products.CMFCore.utils import getToolByName
+import os
+import shutil
+import tempfile
+
+
+class TestSnapshotBuilder(IntegrationTestCase):
+
+    def setUp(self):
+        super(TestSnapshotBuilder, self).setUp()
+        self.source = create(Builder('folder').titled(u'Source'))
+        create(Builder('document').titled(u'One').within(self.source))
+        create(Builder('document').titled(u'Two').within(self.source))
+
+    def catalog_paths(self, obj):
+        catalog = getToolByName(self.portal, 'portal_catalog')
+        return sorted(brain.getPath() for brain in catalog(
+            path='/'.join(obj.getPhysicalPath())))
+
+    def test_imports_copy_of_subtree(self):
+        snapshot = take_snapshot(self.source)
+        target = create(Builder('folder').titled(u'Target'))
+        copy = create(Builder('snapshot').from_(snapshot).within(target))
+
+        self.assertEqual('source', copy.getId())
+        self.assertEqual(['one', 'two'], sorted(copy.objectIds()))
+        self.assertEqual(['/plone/target/source',
+                          '/plone/target/source/one',
+                          '/plone/target/source/two'],
+                         self.catalog_paths(copy))
+
+    def test_copies_get_new_ids_and_uuids(self):
+        snapshot = take_snapshot(self.source)
+        first = create(Builder('snapshot').from_(snapshot))
+        second = create(Builder('snapshot').from_(snapshot))
+
+        self.assertEqual(['source-1', 'source-2'],
+                         [first.getId(), second.getId()])
+        self.assertEqual(3, len(set([IUUID(self.source), IUUID(first),
+                                     IUUID(second)])))
+        self.assertNotEqual(IUUID(self.source.one), IUUID(first.one))
+
+    def test_snapshot_can_be_stored_in_a_file(self):
+        tempdir = tempfile.mkdtemp()
+        try:
+            snapshot = take_snapshot(
+                self.source, os.path.join(tempdir, 'source.zexp'))
+            copy = create(Builder('snapshot').from_(snapshot)
+                          .with_id('copy'))
+        finally:
+            shutil.rmtree(tempdir)
+
+        self.assertEqual(['one', 'two'], sorted(copy.objectIds()))
+
+    def test_indexing_is_optional(self):
+        snapshot = take_snapshot(self.source)
+        copy = create(Builder('snapshot').from_(snapshot).without_indexing())
+        self.assertEqual([], self.catalog_paths(copy))
+
+
+class TestCreateClones(IntegrationTestCase):
+
+    def test_creates_prototype_and_clones(self):
+        folder = create(Builder('folder'))
+
+        def override(obj, index):
+            obj.title = u'Document %s' % index
+
+        documents = create_clones(
+            Builder('document').titled(u'Document').within(folder),
+            3, override=override)
+
+        self.assertEqual(['document', 'document-1', 'document-2'],
+                         [document.getId() for document in documents])
+        catalog = getToolByName(self.portal, 'portal_catalog')
+        self.assertEqual(
+            ['Document 0', 'Document 1', 'Document 2'],
+            sorted(brain.Title for brain in catalog(
+                path='/'.join(folder.getPhysicalPath()),
+                portal_type='Document')))
+
+    def test_no_clones_are_created_for_count_zero(self):
+        self.assertEqual([], list(create_clones(Builder('folder'), 0)))
+        self.assertEqual([], self.portal.contentIds())
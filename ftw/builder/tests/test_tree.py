@@ -0,0 +1,56 @@
+from ftw.builder import Builder
+from ftw.builder import create
+from ftw.builder import create_tree
+from ftw.builder.tests import IntegrationTestCase
+from ftw.builder.tests.test_builder import obj2brain
+from Products.CMFCore.utils import getToolByName
+
+
+class TestCreateTree(IntegrationTestCase):
+
+    def test_creates_hierarchy_and_returns_objects_by_path(self):
+        objects = create_tree({
+            'intranet': {
+                'title': u'Intranet',
+                'children': {
+                    'news': {'title': u'News'},
+                    'welcome': {'builder': 'document',
+                                'title': u'Welcome'}}}})
+
+        self.assertEqual(['intranet', 'intranet/news', 'intranet/welcome'],
+                         sorted(objects))
+        self.assertEqual(objects['intranet'],
+                         objects['intranet/news'].aq_parent)
+        self.assertEqual('Document',
+                         objects['intranet/welcome'].portal_type)
+        self.assertEqual('Welcome', obj2brain(objects['intranet/welcome'])
+                         .Title)
+
+    def test_creates_tree_within_container(self):
+        folder = create(Builder('folder'))
+        objects = create_tree({'child': {'id': 'the-child'}}, within=folder)
+        self.assertEqual(folder, objects['child'].aq_parent)
+        self.assertEqual('the-child', objects['child'].getId())
+
+    def test_review_state_and_local_roles(self):
+        wftool = getToolByName(self.portal, 'portal_workflow')
+        wftool.setChainForPortalTypes(['Folder'],
+                                      'simple_publication_workflow')
+        objects = create_tree({
+            'intranet': {
+                'state': 'published',
+                'local_roles': {'hugo.boss': ['Reader']},
+                'children': {'news': {}}}})
+
+        self.assertEqual('published',
+                         obj2brain(objects['intranet']).review_state)
+        catalog = getToolByName(self.portal, 'portal_catalog')
+        rid = obj2brain(objects['intranet/news']).getRID()
+        self.assertIn('user:hugo.boss',
+                      catalog.getIndexDataForRID(rid)['allowedRolesAndUsers'])
+
+    def test_unknown_node_keys_are_rejected(self):
+        with self.assertRaises(ValueError) as cm:
+            create_tree({'intranet': {'childs': {}}})
+        self.assertEqual('Unknown keys in tree node "intranet": childs',
+                         str(cm.exception))
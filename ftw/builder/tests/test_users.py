@@ -1,8 +1,12 @@
 # -*- coding: utf-8 -*-
 from ftw.builder import Builder
 from ftw.builder import create
+from ftw.builder import create_many
+from ftw.builder import session
+from ftw.builder.tests import FunctionalTestCase
 from ftw.builder.tests import IntegrationTestCase
 from Products.CMFCore.utils import getToolByName
+import transaction
 
 
 class TestUserBuilder(IntegrationTestCase):
@@ -38,6 +42,11 @@ class TestUserBuilder(IntegrationTestCase):
         self.assertEqual(['hans.peter'], portal_groups.getGroupMembers('foo'))
         self.assertEqual(['hans.peter'], portal_groups.getGroupMembers('bar'))
 
+    def test_created_user_knows_its_groups(self):
+        create(Builder('group').with_groupid('foo'))
+        user = create(Builder('user').in_groups('foo'))
+        self.assertIn('foo', user.getGroups())
+
     def test_first_and_lastname_are_capitalized(self):
         user = create(Builder('user').named('hans-peter', 'linder'))
         self.assertEqual('Linder Hans-Peter', user.getProperty('fullname'))
@@ -91,3 +100,88 @@ class TestUserBuilder(IntegrationTestCase):
         rid = catalog(path='/'.join(folder.getPhysicalPath()))[0].getRID()
         self.assertIn('user:{0}'.format(user.getId()),
                       catalog.getIndexDataForRID(rid)['allowedRolesAndUsers'])
+
+
+class TestDeferredGroupMemberships(FunctionalTestCase):
+
+    def setUp(self):
+        super(TestDeferredGroupMemberships, self).setUp()
+        session.current_session.auto_commit = False
+        session.current_session.defer_group_memberships = True
+
+    def test_memberships_of_aborted_transactions_are_dropped(self):
+        create(Builder('user').named('Hans', 'Peter').in_groups('foo'))
+        transaction.abort()
+        self.assertEqual(0, len(session.current_session.group_memberships))
+
+    def test_memberships_are_written_on_commit_after_an_abort(self):
+        create(Builder('user').named('Rolled', 'Back').in_groups('foo'))
+        transaction.abort()
+
+        create(Builder('group').with_groupid('foo'))
+        create(Builder('user').named('Hans', 'Peter').in_groups('foo'))
+        transaction.commit()
+
+        portal_groups = getToolByName(self.portal, 'portal_groups')
+        self.assertEqual(['hans.peter'], portal_groups.getGroupMembers('foo'))
+
+
+class TestBulkUserCreation(IntegrationTestCase):
+
+    def test_users_are_created_in_bulk(self):
+        create(Builder('group').with_groupid('staff'))
+        users = create_many(
+            Builder('user').in_groups('staff').with_roles('Member', 'Editor'),
+            3,
+            vary=lambda builder, index: builder.named('User', str(index)),
+            raw=True)
+
+        self.assertEqual(['user.0', 'user.1', 'user.2'],
+                         [user.getId() for user in users])
+
+        member = users[1].getMember()
+        self.assertEqual('1 User', users[1].getProperty('fullname'))
+        self.assertEqual('1 User', member.getProperty('fullname'))
+        self.assertEqual('user@1.com', member.getProperty('email'))
+        self.assertEqual(set(['Authenticated', 'Member', 'Editor']),
+                         set(member.getRoles()))
+
+        portal_groups = getToolByName(self.portal, 'portal_groups')
+        self.assertEqual(['user.0', 'user.1', 'user.2'],
+                         sorted(portal_groups.getGroupMembers('staff')))
+
+    def test_local_roles_of_bulk_created_users(self):
+        folder = create(Builder('folder'))
+        users = create_many(
+            Builder('user').with_roles('Reader', on=folder),
+            2,
+            vary=lambda builder, index: builder.with_userid('u%s' % index),
+            raw=True)
+
+        self.assertEqual(
+            set(['Authenticated', 'Member', 'Reader']),
+            set(users[0].getMember().getRolesInContext(folder)))
+
+
+class TestReusePasswordHashes(IntegrationTestCase):
+
+    def setUp(self):
+        super(TestReusePasswordHashes, self).setUp()
+        session.current_session.reuse_password_hashes = True
+
+    def test_password_is_hashed_once_per_session(self):
+        create(Builder('user').named('Hugo', 'Boss'))
+        create(Builder('user').named('John', 'Doe'))
+
+        source_users = self.portal.acl_users.source_users
+        passwords = source_users._user_passwords
+        self.assertEqual(passwords['hugo.boss'], passwords['john.doe'])
+
+    def test_user_can_login_with_plain_password(self):
+        create(Builder('user').named('Hugo', 'Boss').with_password('s3cr3t!'))
+
+        source_users = self.portal.acl_users.source_users
+        self.assertEqual(
+            ('hugo.boss', 'hugo.boss'),
+            source_users.authenticateCredentials(
+                {'login': 'hugo.boss', 'password': 's3cr3t!'}))
@@ -1,6 +1,7 @@
 from __future__ import print_function
 from ftw.builder.utils import parent_namespaces
 from ftw.builder.utils import serialize_callable
+from ftw.builder.utils import strip_diacricits
 from unittest import TestCase
 
 
@@ -78,3 +79,12 @@ def print_docs():
 
         self.assertEqual('A callable is required.',
                          str(cm.exception))
+
+
+class TestStripDiacritics(TestCase):
+
+    def test_strips_diacritics(self):
+        self.assertEqual('hans-peter', strip_diacricits(u'h\xe4ns-p\xe9ter'))
+
+    def test_ascii_text_is_returned_unchanged(self):
+        self.assertEqual('hans-peter', strip_diacricits('hans-peter'))
@@ -0,0 +1,86 @@
+from collections import deque
+from collections import OrderedDict
+from ftw.builder import session
+from ftw.builder.builder import Builder
+from ftw.builder.builder import create
+from zope.component.hooks import getSite
+
+
+NODE_KEYS = ('builder', 'portal_type', 'id', 'title', 'arguments', 'state',
+             'local_roles', 'children')
+
+
+def create_tree(spec, within=None):
+    """Creates a content hierarchy described by a nested spec.
+
+    The spec maps names to nodes. A node is a dict with these optional keys:
+
+    - ``builder``: name of the registered builder (default: ``folder``)
+    - ``portal_type``: portal_type overriding the one of the builder
+    - ``id``: id of the object
+    - ``title``: title of the object
+    - ``arguments``: dict of arguments passed to ``having``
+    - ``state``: review state of the object
+    - ``local_roles``: dict mapping principal ids to a list of roles
+    - ``children``: spec of the children of the object
+
+    The objects are created breadth-first within one ``batch``, so that
+    they are reindexed in one pass and committed at most once.
+    A dict mapping the spec paths (e.g. ``'intranet/news'``) to the created
+    objects is returned.
+    """
+    container = within if within is not None else getSite()
+    objects = OrderedDict()
+    queue = deque(iter_nodes(spec, None, container))
+
+    with session.current_session.batch():
+        while queue:
+            path, node, parent = queue.popleft()
+            obj = create(node_to_builder(node, parent))
+            objects[path] = obj
+            set_local_roles(obj, node.get('local_roles'))
+            queue.extend(iter_nodes(node.get('children'), path, obj))
+
+    return objects
+
+
+def iter_nodes(spec, parent_path, parent):
+    for name, node in (spec or {}).items():
+        node = node or {}
+        unknown = set(node) - set(NODE_KEYS)
+        if unknown:
+            raise ValueError('Unknown keys in tree node "{0}": {1}'.format(
+                name, ', '.join(sorted(unknown))))
+
+        path = name if parent_path is None else '/'.join((parent_path, name))
+        yield path, node, parent
+
+
+def node_to_builder(node, parent):
+    builder = Builder(node.get('builder', 'folder')).within(parent)
+
+    if 'portal_type' in node:
+        builder.portal_type = node['portal_type']
+    if 'title' in node:
+        builder.titled(node['title'])
+    if 'arguments' in node:
+        builder.having(**node['arguments'])
+    if 'state' in node:
+        builder.in_state(node['state'])
+    if 'id' in node:
+        with_id = getattr(builder, 'with_id', None)
+        if with_id is not None:
+            with_id(node['id'])
+        else:
+            builder.having(id=node['id'])
+
+    return builder
+
+
+def set_local_roles(obj, local_roles):
+    if not local_roles:
+        return
+
+    for principal, roles in local_roles.items():
+        obj.manage_setLocalRoles(principal, tuple(roles))
+    session.current_session.reindex_security(obj)
@@ -2,9 +2,13 @@ from ftw.builder import builder_registry
 from ftw.builder.utils import strip_diacricits
 from plone.i18n.normalizer.interfaces import IIDNormalizer
 from Products.CMFCore.utils import getToolByName
-from zope.component import getUtility
+from Products.PluggableAuthService.interfaces.plugins import IPropertiesPlugin
+from Products.PluggableAuthService.interfaces.plugins import IRoleAssignerPlugin
+from Products.PluggableAuthService.interfaces.plugins import IUserAdderPlugin
+from Products.PluggableAuthService.PropertiedUser import PropertiedUser
+from Products.PluggableAuthService.UserPropertySheet import UserPropertySheet
 from zope.component.hooks import getSite
-import transaction
+import six
 
 import pkg_resources
 try:
@@ -62,18 +66,91 @@ class UserBuilder(object):
     def create(self):
         self.before_create()
         user = self.create_user(self.userid,
-                                self.password,
+                                self.get_password(),
                                 self.roles,
                                 self.properties)
         self.after_create(user)
         return user
 
+    def create_batch(self, builders):
+        """Creates the users of many configured user builders at once.
+
+        Instead of registering each user with ``portal_registration``, the
+        users, their roles and their properties are written directly to the
+        PAS plugins. The group memberships are queued on the session and
+        written when its group memberships are flushed. Groups which are not
+        stored in the group plugin still get one
+        ``portal_groups.addPrincipalToGroup`` call per user.
+        No events are fired and no password validation happens.
+        Lightweight ``MemberHandle`` objects are returned.
+        """
+        acl_users = getToolByName(self.portal, 'acl_users')
+        mdtool = getToolByName(self.portal, 'portal_memberdata')
+        plugins = acl_users.plugins
+        adder = plugins.listPlugins(IUserAdderPlugin)[0][1]
+        role_assigner = plugins.listPlugins(IRoleAssignerPlugin)[0][1]
+        properties_plugin = [
+            plugin for _, plugin in plugins.listPlugins(IPropertiesPlugin)
+            if getattr(plugin, 'setPropertiesForUser', None) is not None][0]
+        property_ids = set(mdtool.propertyIds())
+
+        handles = []
+        for builder in builders:
+            builder.before_create()
+            userid = builder.userid
+            adder.doAddUser(userid, builder.get_password())
+
+            for role in builder.roles:
+                role_assigner.doAssignRoleToPrincipal(userid, role)
+
+            properties = dict(
+                (name, value) for name, value in builder.properties.items()
+                if name in property_ids)
+            properties_plugin.setPropertiesForUser(
+                PropertiedUser(userid, userid),
+                UserPropertySheet(properties_plugin.getId(), **properties))
+
+            for context, roles in builder.local_roles.items():
+                context.manage_setLocalRoles(userid, tuple(roles))
+                builder.session.reindex_security(context)
+
+            builder.set_groups(userid)
+            handles.append(MemberHandle(userid, builder.properties))
+
+        for builder, handle in zip(builders, handles):
+            builder.after_create(handle)
+        return handles
+
+    def get_password(self):
+        """Returns the password to store for the user.
+        When the session's ``reuse_password_hashes`` option is enabled,
+        each distinct password is hashed only once per session and the hash
+        is stored for every user with this password. The users can still
+        log in with the plain password.
+        """
+        if not self.session.reuse_password_hashes:
+            return self.password
+
+        hashes = self.session.password_hashes
+        if self.password not in hashes:
+            acl_users = getToolByName(self.portal, 'acl_users')
+            adder = acl_users.plugins.listPlugins(IUserAdderPlugin)[0][1]
+            encrypt = getattr(adder, '_pw_encrypt', None)
+            if encrypt is None:
+                hashes[self.password] = self.password
+            else:
+                hashes[self.password] = six.ensure_str(encrypt(self.password))
+        return hashes[self.password]
+
     def create_user(self, userid, password, roles, properties):
         regtool = getToolByName(self.portal, 'portal_registration')
         mtool = getToolByName(self.portal, 'portal_membership')
         user = regtool.addMember(userid, password, (), properties=properties)
         self.set_roles(user.getId(), roles)
         self.set_groups(user.getId())
+        # The member's groups are looked up when getting the member.
+        if not self.session.defer_group_memberships:
+            self.session.flush_group_memberships()
         return mtool.getMemberById(userid)
 
     def set_roles(self, userid, roles):
@@ -82,22 +159,24 @@ class UserBuilder(object):
 
         for context, roles in self.local_roles.items():
             context.manage_setLocalRoles(userid, tuple(roles))
-            context.reindexObjectSecurity()
+            self.session.reindex_security(context)
 
     def set_groups(self, userid):
         if not self.groupids:
             return
 
-        portal_groups = getToolByName(self.portal, 'portal_groups')
         for groupid in self.groupids:
-            portal_groups.addPrincipalToGroup(userid, groupid)
+            self.session.add_group_members(groupid, [userid])
 
     def before_create(self):
         self.update_properties()
 
     def after_create(self, user):
-        if self.session.auto_commit:
-            transaction.commit()
+        if not self.session.defer_group_memberships:
+            self.session.flush_group_memberships()
+        if not self.session.defer_indexing:
+            self.session.flush_indexing()
+        self.session.maybe_commit()
 
     def update_properties(self):
         lastname = self.properties.get('lastname').title()
@@ -112,16 +191,18 @@ class UserBuilder(object):
 
     def update_email(self, firstname, lastname):
         if not self.properties.get('email', None):
-            firstname = self.normalize_name_for_email(firstname)
-            lastname = self.normalize_name_for_email(lastname)
+            key = (type(self), 'email')
+            firstname = self.session.names.memoize(
+                key, firstname, self.normalize_name_for_email)
+            lastname = self.session.names.memoize(
+                key, lastname, self.normalize_name_for_email)
             email = '%s@%s.com' % (firstname, lastname)
             self.properties['email'] = email
 
     def update_userid_and_username(self, firstname, lastname):
         if self.userid is None:
-            normalizer = getUtility(IIDNormalizer)
-            first = normalizer.normalize(firstname)
-            last = normalizer.normalize(lastname)
+            first = self.session.names.normalize(IIDNormalizer, firstname)
+            last = self.session.names.normalize(IIDNormalizer, lastname)
             self.userid = '.'.join((first, last))
 
         if not self.properties.get('username', None):
@@ -132,4 +213,29 @@ class UserBuilder(object):
         name = name.replace(' ', '-')
         return strip_diacricits(name)
 
+
+class MemberHandle(object):
+    """A lightweight reference to a user created with
+    ``UserBuilder.create_batch``. The member object is only looked up
+    when calling ``getMember``.
+    """
+
+    def __init__(self, userid, properties):
+        self.userid = userid
+        self.properties = properties
+
+    def getId(self):
+        return self.userid
+
+    def getUserName(self):
+        return self.properties.get('username', self.userid)
+
+    def getProperty(self, name, default=None):
+        return self.properties.get(name, default)
+
+    def getMember(self):
+        mtool = getToolByName(getSite(), 'portal_membership')
+        return mtool.getMemberById(self.userid)
+
+
 builder_registry.register('user', UserBuilder)
@@ -7,8 +7,13 @@ import unicodedata
 
 def strip_diacricits(text):
     text = six.ensure_text(text)
-    normalized = unicodedata.normalize('NFKD', text)
-    text = u''.join([c for c in normalized if not unicodedata.combining(c)])
+    # ASCII text has no diacritics and is not changed by NFKD.
+    try:
+        text.encode('ascii')
+    except UnicodeEncodeError:
+        normalized = unicodedata.normalize('NFKD', text)
+        text = u''.join(
+            [c for c in normalized if not unicodedata.combining(c)])
     text = six.ensure_str(text)
     return text
 